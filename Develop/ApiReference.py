@@ -4,6 +4,8 @@ import time
 import numpy as np
 import pandas as pd
 import streamlit as st
+from utils.datasets import get_dataset
+from utils.delta_editor import delta_editor
 from annotated_text import annotated_text #pip install st-annotated-text
 import plotly.express as px #pip install plotly
  
@@ -95,13 +97,14 @@ st.write("st.dataframe — tabla interactiva:")
 st.dataframe(df, hide_index=True)
 
 st.write("st.data_editor — editable, con filas dinámicas:")
-edited = st.data_editor(
-    df.copy(),
+# Sin df.copy(): delta_editor comparte df como base y solo guarda los cambios (utils/delta_editor.py)
+delta = delta_editor(
+    "api_editor",
+    df,
     num_rows="dynamic",
-    key="api_editor",
     column_config={"value": st.column_config.NumberColumn("Value", min_value=0)}
 )
-st.json({"edited_rows": len(edited)})
+st.json({**delta.summary(), "errors": delta.errors})
 
 st.write("st.table — tabla estática:")
 st.table(df.head(3))
@@ -245,7 +248,7 @@ st.camera_input("st.camera_input — tomar foto", key="api_cam")
 st.subheader("Media elements")
 
 st.write("st.image — desde array")
-arr = (np.random.rand(120, 160, 3) * 255).astype(np.uint8)
+arr = get_dataset("random_image")
 st.image(arr, caption="Imagen random 160x120")
 
 # Logo (usa ./static/cat.png si existe)
@@ -2,11 +2,21 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import time
-from threading import Thread
-from models import Product, ApiClient
+from models import Product, ProductBatch, ApiClient
+from utils.datasets import get_dataset
+from utils.sections import Sections
+from utils.live_updates import LiveUpdater
+from utils.jobs import get_job_manager, watch_jobs
+from utils.compute import run_compute
+from utils.memo import memoize
+from utils.delta_editor import delta_editor
+import utils.analysis  # registra los cálculos de run_compute
 
 st.set_page_config(page_title="AppDesign", page_icon=":material/brush:")
 
+# Secciones con rerun parcial (utils/sections.py)
+sections = Sections("appdesign")
+
 st.title("AppDesign")
 st.write("Librería de iconos:")
 #icons: https://fonts.google.com/icons?icon.set=Material+Symbols&icon.style=Rounded
@@ -42,32 +52,39 @@ if st.button("Iniciar simulación"):
     chart = st.line_chart(pd.DataFrame({"y": []}))
 
     # Simulación de datos/avance
+    # LiveUpdater agrupa las actualizaciones: como mucho 10 envíos por segundo aunque haya más datos
+    rng = np.random.default_rng()
     vals = []
-    for i in range(101):
-        # Simula trabajo
-        time.sleep(0.02)
 
-        # Actualiza progreso
-        prog.progress(i)
+    def bloque(i):
+        st.metric("Iteración", i)
+        # Tabla pequeña con últimas 5 observaciones
+        st.table(pd.DataFrame({"y": vals[-5:]}))
+
+    with LiveUpdater(fps=10) as live:
+        for i in range(101):
+            # Simula trabajo
+            time.sleep(0.02)
+
+            # Actualiza progreso
+            live.progress(prog, i)
 
-        # Genera un nuevo dato
-        new_val = (np.sin(i/10) + np.random.randn()*0.05) * 10 + 50
-        vals.append(new_val)
+            # Genera un nuevo dato
+            new_val = (np.sin(i/10) + rng.standard_normal()*0.05) * 10 + 50
+            vals.append(new_val)
 
-        # dataframe y tablas se pueden actualizar sin rerun con add_rows
-        chart.add_rows(pd.DataFrame({"y": [new_val]}))
+            # dataframe y tablas se pueden actualizar sin rerun con add_rows (las filas se envían por lotes)
+            live.add_rows(chart, {"y": new_val})
 
-        # 3) Reescribe un bloque completo dentro de st.empty()
-        with ph.container():
-            st.metric("Iteración", i)
-            # Tabla pequeña con últimas 5 observaciones
-            last = pd.DataFrame({"y": vals[-5:]})
-            st.table(last)
+            # 3) Reescribe un bloque completo dentro de st.empty() (solo el último estado en cada envío)
+            live.render(ph, bloque, i)
 
-        if i == 1:
-            status.update(label="Procesando...", state="running")
-        if i == 50:
-            status.update(label="Mitad del proceso", state="running", expanded=False)
+            if i == 1:
+                status.update(label="Procesando...", state="running")
+            if i == 50:
+                status.update(label="Mitad del proceso", state="running", expanded=False)
+
+    st.caption(f"{live.updates} actualizaciones → {live.messages} envíos al navegador")
 
     # Cierre: limpia barra y marca estado completo
     status.update(label="Completado", state="complete", expanded=False)
@@ -193,38 +210,53 @@ st.write("Cualquier cambio en un widget hace que se ejecute de arriba a abajo de
 "Par estos casos, lo mejor es guardar los resultados en data persistente y hacer que este proceso pesado de calculo solo se ejecute cuando se pulsa " \
 "un botón, por ejemplo")
 
-# Parámetros (cambian a menudo y provocan reruns)
-size = st.selectbox("Tamaño", [1000, 5000, 20000])
-add  = st.number_input("Sumar", 0, 10, 0)
-_    = st.text_input("Notas (provoca reruns pero no recalcula nada)")
-
-# Clave única del resultado para estos parámetros
-run_key = f"{size}|{add}"
-
-st.session_state.setdefault("results", {})  # dict: run_key -> DataFrame
-
-def expensive(size, add):
-    with st.spinner("Procesando..."):
-        time.sleep(2)  # simula trabajo pesado
-    # resultado cualquiera (p. ej., columna con rango + offset)
-    return pd.DataFrame({"x": range(size), "y": [add]*size})
-
-# 1) Ejecutar solo al pulsar el botón, guardar resultado
-if st.button("Procesar"):
-    st.session_state["results"][run_key] = expensive(size, add)
-    st.success("Resultado guardado en session_state.")
-
-# 2) Mostrar resultado si existe (reutiliza, no recalcula)
-if run_key in st.session_state["results"]:
-    st.info("Usando resultado guardado para estos parámetros.")
-    st.dataframe(st.session_state["results"][run_key].head(10), use_container_width=True)
-else:
-    st.warning("Aún no hay resultado para estos parámetros. Pulsa Procesar.")
-
-# (Opcional) limpiar todo
-if st.button("Limpiar resultados"):
-    st.session_state["results"].clear()
-    st.rerun()
+# Memoizado entre sesiones (utils/memo.py): si otro usuario ya pidió los mismos parámetros,
+# el resultado sale de memoria o de disco. El código de utils.analysis.expensive forma parte de la clave.
+@memoize(ttl=3600, depends=[utils.analysis.expensive], name="appdesign.expensive")
+def expensive_cached(size, add):
+    return run_compute("expensive", size, add)
+
+# Sección con rerun parcial: cambiar los parámetros o las notas solo re-ejecuta este bloque
+@sections.section()
+def proceso_costoso():
+    # Parámetros (cambian a menudo y provocan reruns)
+    size = st.selectbox("Tamaño", [1000, 5000, 20000])
+    add  = st.number_input("Sumar", 0, 10, 0)
+    _    = st.text_input("Notas (provoca reruns pero no recalcula nada)")
+
+    # Clave única del resultado para estos parámetros
+    run_key = f"{size}|{add}"
+
+    # En la sesión solo se guardan las claves procesadas: el DataFrame vive en el memo compartido
+    # (no se copia por sesión ni gasta su presupuesto). utils/result_store.py es para resultados
+    # propios de cada sesión, no para los que ya comparte @memoize.
+    processed = st.session_state.setdefault("procesados", set())
+
+    # 1) Ejecutar solo al pulsar el botón, guardar resultado
+    # expensive (utils/analysis.py) corre en el pool de procesos: no retiene el GIL del servidor
+    if st.button("Procesar"):
+        with st.spinner("Procesando..."):
+            expensive_cached(size, add)
+        processed.add(run_key)
+        st.success("Resultado guardado en el cache compartido.")
+
+    # 2) Mostrar resultado si existe (reutiliza, no recalcula salvo que el memo lo haya expulsado)
+    if run_key in processed:
+        st.info("Usando resultado guardado para estos parámetros.")
+        st.dataframe(expensive_cached(size, add).head(10), use_container_width=True)
+    else:
+        st.warning("Aún no hay resultado para estos parámetros. Pulsa Procesar.")
+
+    # (Opcional) limpiar todo
+    if st.button("Limpiar resultados"):
+        processed.clear()
+        st.rerun()
+    if st.button("Invalidar cache compartido"):
+        expensive_cached.invalidate()  # todas las sesiones recalcularán
+
+    with st.expander("Memoización compartida (todas las sesiones)"):
+        st.json(expensive_cached.stats())
+proceso_costoso()
 
 st.header("3.Dataframes")
 st.subheader("Se pueden hacer un monton de cosas con dataframes, enseñar info, modificar, ver las modificaciones hechas...")
@@ -237,101 +269,106 @@ df = pd.DataFrame([
 st.write("Dataframe **no editable**: st.dataframe")
 st.dataframe(df, hide_index=True ,use_container_width=True)
 
-st.write("Dataframe **editable**: st.data_editor, columnas obligatorias de escribir, min y max value para rating")
-
-st.data_editor(
-    df,
-    column_config={
-    "command":   st.column_config.TextColumn("Command", required=True, width="medium"),
-    "rating":    st.column_config.NumberColumn("Rating", min_value=0, max_value=5, step=1),
-    "is_widget": st.column_config.CheckboxColumn("Is widget?"),
-    "color":     st.column_config.SelectboxColumn("Color", options=["red","blue","green"]),
-    "when":      st.column_config.DatetimeColumn("When (Europe/Madrid)", timezone="Europe/Madrid"),
-    },
-    hide_index=True,
-    use_container_width=True,
-    num_rows="dynamic",  # permite +/− filas
-)
-
-st.subheader("También podemos printar listas, listas de diccionarios y diccionarios")
-colors = st.data_editor(["red","green","blue"], num_rows="dynamic")
-st.write("Colores:", colors)
-
-# Lista de dicts
-records = st.data_editor([
-    {"name":"st.text_area","type":"widget"},
-    {"name":"st.markdown","type":"element"},
-])
-st.write(records)
-
-# Diccionario
-d = st.data_editor({"st.text_area":"widget","st.markdown":"element"})
-st.write(d)
+@sections.section()
+def editores():
+    st.write("Dataframe **editable**: st.data_editor, columnas obligatorias de escribir, min y max value para rating")
+
+    # Solo se guardan los cambios (utils/delta_editor.py): df es la base compartida y no se copia
+    delta = delta_editor(
+        "appdesign_commands",
+        df,
+        column_config={
+        "command":   st.column_config.TextColumn("Command", required=True, width="medium"),
+        "rating":    st.column_config.NumberColumn("Rating", min_value=0, max_value=5, step=1),
+        "is_widget": st.column_config.CheckboxColumn("Is widget?"),
+        "color":     st.column_config.SelectboxColumn("Color", options=["red","blue","green"]),
+        "when":      st.column_config.DatetimeColumn("When (Europe/Madrid)", timezone="Europe/Madrid"),
+        },
+        hide_index=True,
+        use_container_width=True,
+        num_rows="dynamic",  # permite +/− filas
+    )
+    st.caption(f"Cambios sin guardar: {delta.summary()}")
+    for error in delta.errors:
+        st.error(error)
+    if st.button("Guardar cambios", disabled=delta.empty or bool(delta.errors)):
+        delta.commit()  # un lote en el registro de cambios de la tabla
+        st.rerun()
+
+    st.subheader("También podemos printar listas, listas de diccionarios y diccionarios")
+    colors = st.data_editor(["red","green","blue"], num_rows="dynamic")
+    st.write("Colores:", colors)
+
+    # Lista de dicts
+    records = st.data_editor([
+        {"name":"st.text_area","type":"widget"},
+        {"name":"st.markdown","type":"element"},
+    ])
+    st.write(records)
+
+    # Diccionario
+    d = st.data_editor({"st.text_area":"widget","st.markdown":"element"})
+    st.write(d)
+editores()
 
 st.header("4. Multithreading")
 st.markdown("""
 **A tener en cuenta:**
 - No llames `st.*` dentro de hilos propios.
 - Úsalo para `IO` o `cálculos pesados`
-- Une los hilos con `join()` y no dejes hilos vivos tras el rerun.
+- No dejes el script esperando a los hilos: lanza la tarea en `utils/jobs.py`, guarda su id y
+  deja que un fragment muestre el progreso (sobrevive a los reruns).
 """)
 
 
-col_left, col_right = st.columns(2, gap="large")
-
-with col_left:
-    st.subheader("Tarea A")
-    a_status = st.empty() 
-with col_right:
-    st.subheader("Tarea B")
-    b_status = st.empty()
-
-# --- Worker sin llamadas a st.* ---
-class Worker(Thread):
-    def __init__(self, label: str, delay: float):
-        super().__init__(daemon=True)
-        self.label = label
-        self.delay = delay
-        self.result = None
-
-    def run(self):
-        # Simula trabajo de IO (no llamar st.* aquí)
-        total = 0
-        for i in range(1, 6):
-            time.sleep(self.delay)  # espera "red"
-            total += i
-        self.result = f"{self.label}: total={total}, delay={self.delay}s"
-
-# --- Lanzar tareas al pulsar el botón ---
-if st.button("Ejecutar tareas en paralelo"):
-    a = Worker("A", 0.2)
-    b = Worker("B", 0.3)
-    a.start() 
-    b.start()
-
-
-    a_open, b_open = True, True
-    while a_open or b_open:
-        if a_open:
-            if not a.is_alive():
-                a_status.success(a.result)
-                a_open = False
+# --- Tarea sin llamadas a st.* ---
+# Se ejecuta en el pool de hilos de utils/jobs.py: el script no espera y un rerun no la pierde.
+def tarea_io(label: str, delay: float, job):
+    # Simula trabajo de IO (no llamar st.* aquí)
+    total = 0
+    for i in range(1, 6):
+        if job.cancelled:
+            return None
+        time.sleep(delay)  # espera "red"
+        total += i
+        job.progress(i / 5, f"paso {i}/5")
+    return f"{label}: total={total}, delay={delay}s"
+
+jobs = get_job_manager()
+st.session_state.setdefault("job_ids", {})
+
+# --- Lanzar tareas al pulsar el botón (solo se guardan los ids) ---
+c1, c2 = st.columns(2)
+if c1.button("Ejecutar tareas en paralelo"):
+    st.session_state.job_ids = {
+        "A": jobs.submit(tarea_io, "A", 0.2, label="Tarea A").id,
+        "B": jobs.submit(tarea_io, "B", 0.3, label="Tarea B").id,
+    }
+if c2.button("Cancelar tareas"):
+    for job_id in st.session_state.job_ids.values():
+        jobs.cancel(job_id)
+
+def pintar_tareas(lista):
+    cols = st.columns(2, gap="large")
+    for col, job in zip(cols, lista):
+        with col:
+            st.subheader(job.label)
+            if job.pending:
+                st.progress(job.fraction, text=job.message or "trabajando")
+            elif job.status == "done":
+                st.success(job.result)
+            elif job.status == "error":
+                st.error(f"Error: {job.error}")
             else:
-                a_status.info("trabajando")
-        if b_open:
-            if not b.is_alive():
-                b_status.success(b.result)
-                b_open = False
-            else:
-                b_status.info("trabajando")
-
-        time.sleep(0.1)
+                st.warning("Cancelada")
+    if lista and not any(j.pending for j in lista):
+        st.success("Tareas finalizadas.")
 
-    # Garantiza que no quedan hilos vivos:
-    a.join()
-    b.join()
+# El estado se pinta en un fragment que se refresca solo mientras haya tareas pendientes
+watch_jobs(list(st.session_state.job_ids.values()), pintar_tareas)
 
-    st.success("Tareas finalizadas.")
+with st.expander("Estado del gestor de tareas"):
+    st.json(jobs.stats())
 
 
 st.subheader("5. Using custom Python classes in your Streamlit app")
@@ -365,7 +402,17 @@ st.write("Restaurado (Product):", restored.to_dict())
 
 st.divider()
 
+# === B2) Muchos productos: columnas en vez de objetos ===
+st.markdown("**B2) Muchos productos: `ProductBatch` (columnas NumPy)**")
+batch = ProductBatch.from_frame(get_dataset("products"))
+st.write(f"{len(batch)} productos; el primero como Product:", batch[0].to_dict())
+st.dataframe(batch.to_frame().head(5), hide_index=True)
+
+st.divider()
+
 # === C) Singleton con cache_resource ===
 st.markdown("**C) Singleton `@st.cache_resource`**")
 client = ApiClient.get("https://api.example.com")
 st.write("id(cliente):", id(client))
+st.caption("Pool, reintentos y cache compartidos por todas las sesiones (`client.get_json('/ruta')`):")
+st.json(client.stats())
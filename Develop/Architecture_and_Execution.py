@@ -1,61 +1,64 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from utils.state_sync import mirror_global_to_local, bind_local_to_global, init_global
+from utils.state_sync import GLOBALS
+from utils.filter_index import get_group_score_index
+from utils.datasets import dataset_version, get_dataset
+from utils.map_render import category_rgba, render_map
+from utils.sections import Sections
 
 
 st.set_page_config(page_title="Architecture", page_icon=":material/dashboard:")
 
 st.title("Architecture")
+
+# Secciones con rerun parcial: tocar un widget de una sección solo re-ejecuta esa sección (utils/sections.py)
+sections = Sections("architecture")
 st.write("Esta página tiene **sus propios controles locales**, sincronizados con el **mismo estado global**.")
 
 #---------------------------------
 # SINCRONIZACIÓN VARIABLES GLOBALES → TEXTO EN PANTALLA
 st.subheader("Sincronización con estado global")
 st.markdown("""
-Esta página usa un patrón **global ↔ local** para que varios módulos compartan filtros:
+Esta página usa un patrón **global ↔ local** para que varios módulos compartan filtros, con un registro declarativo (`GLOBALS` en `utils/state_sync.py`):
 
-- `init_global(key, default)`: garantiza que la clave **global** exista (una sola vez por sesión).
-- `mirror_global_to_local(local_key, global_key)`: **antes de dibujar** los widgets, copia **global → local** para que la UI muestre el último valor consolidado.
-- `bind_local_to_global(local_key, global_key)`: callback `on_change` que sube cambios **local → global** cuando el usuario interactúa.
+- `GLOBALS.declare(key, default)`: cada global se declara **una sola vez**; `GLOBALS.init()` la crea en la sesión si falta.
+- `GLOBALS.sync({local_key: global_key})`: **antes de dibujar** los widgets, copia **global → local** solo las claves cuya **versión** cambió desde la última vez (coste constante aunque haya muchos filtros).
+- `GLOBALS.bind(local_key, global_key)`: callback `on_change` que encola el cambio **local → global**; las escrituras se aplican juntas y suben la versión.
 """)
-# --- Garantiza claves globales (por acceso directo) ---
-init_global("global_group", "A")
-init_global("global_threshold", 50)
-
-# --- ANTES de dibujar widgets: copia global -> local SIEMPRE ---
-mirror_global_to_local("_local_group", "global_group")
-mirror_global_to_local("_local_threshold", "global_threshold")
-
-with st.expander("Controles locales (sincronizados con el estado global)", expanded=True):
-    st.selectbox(
-        "Group (local)",
-        ["A", "B", "C"],
-        key="_local_group",
-        on_change=bind_local_to_global("_local_group", "global_group")
-    )
-    st.slider(
-        "Threshold (local)",
-        0, 100,
-        key="_local_threshold",
-        on_change=bind_local_to_global("_local_threshold", "global_threshold")
+# Depende de globales compartidas: fragment que se actualiza solo si otra pestaña del usuario las cambia
+@GLOBALS.shared_section()
+def filtros_globales():
+    # --- ANTES de dibujar widgets: copia global -> local solo lo que cambió (crea las globales si faltan) ---
+    GLOBALS.sync({"_local_group": "global_group", "_local_threshold": "global_threshold"})
+
+    with st.expander("Controles locales (sincronizados con el estado global)", expanded=True):
+        st.selectbox(
+            "Group (local)",
+            ["A", "B", "C"],
+            key="_local_group",
+            on_change=GLOBALS.bind("_local_group", "global_group")
+        )
+        st.slider(
+            "Threshold (local)",
+            0, 100,
+            key="_local_threshold",
+            on_change=GLOBALS.bind("_local_threshold", "global_threshold")
+        )
+
+    st.write("---")
+    st.subheader("Resumen por grupo condicionado por el estado global")
+    df = get_dataset("scores_300")  # compartido y generado una sola vez (utils/datasets.py)
+
+    st.write(f"Threshold global ≥ **{st.session_state['global_threshold']}**. Grupo global actual: **{st.session_state['global_group']}**.")
+
+    st.write("Vista específica del grupo global:")
+    index = get_group_score_index("scores_300", dataset_version("scores_300"), df)  # mismo índice cacheado (cache_resource) en todas las sesiones
+    st.dataframe(
+        index.filter(df, st.session_state["global_group"], st.session_state["global_threshold"], limit=15),
+        use_container_width=True
     )
-
-st.write("---")
-st.subheader("Resumen por grupo condicionado por el estado global")
-np.random.seed(0)
-df = pd.DataFrame({
-    "group": np.random.choice(["A","B","C"], size=300),
-    "score": np.random.randint(0, 101, size=300),
-})
-
-st.write(f"Threshold global ≥ **{st.session_state['global_threshold']}**. Grupo global actual: **{st.session_state['global_group']}**.")
-
-st.write("Vista específica del grupo global:")
-st.dataframe(
-    df[(df["group"] == st.session_state["global_group"]) & (df["score"] >= st.session_state["global_threshold"])].head(15),
-    use_container_width=True
-)
+filtros_globales()
 
 
 #---------------------------------
@@ -84,17 +87,20 @@ st.markdown("""
 - `args` pasa argumentos **por posición**; `kwargs` por **nombre** (útil para claridad).
 """)
 
-if "count" not in st.session_state:
-    st.session_state.count = 0
+@sections.section(writes=["count"])
+def contador():
+    if "count" not in st.session_state:
+        st.session_state.count = 0
 
-def change_counter(delta=0):
-    st.session_state.count += delta
+    def change_counter(delta=0):
+        st.session_state.count += delta
 
-st.button("Añadir 5", on_click=change_counter, kwargs={"delta": 5}) #tmb se podria args=(5). Args -> parametros por posicion. kwargs -> parametros por nombre de parametro explicito
-st.button("Añadir valor actual", on_click=change_counter, kwargs={"delta": st.session_state.count})
-st.button("Restar 1", on_click=change_counter, kwargs={"delta": -1})
+    st.button("Añadir 5", on_click=change_counter, kwargs={"delta": 5}) #tmb se podria args=(5). Args -> parametros por posicion. kwargs -> parametros por nombre de parametro explicito
+    st.button("Añadir valor actual", on_click=change_counter, kwargs={"delta": st.session_state.count})
+    st.button("Restar 1", on_click=change_counter, kwargs={"delta": -1})
 
-st.write("Count =", st.session_state.count)
+    st.write("Count =", st.session_state.count)
+contador()
 
 
 # WIDGETS CON MEMORIA (key) → TEXTO EN PANTALLA
@@ -127,55 +133,63 @@ Los **forms** retrasan el rerun hasta pulsar **Submit**. Útiles para confirmar
 El bloque `with st.form(...):` es un **context manager** (gestiona apertura/cierre automáticamente).
 """)
 
-with st.form("suma"): #with manera de python de manejar automaticamente memoryleaks rollo cuando abres cierras un doc de I/O. Se usa para: forms, columnas y container
-    a = st.number_input("a", step=1.0)
-    b = st.number_input("b", step=1.0)
-    submitted = st.form_submit_button("Sumar")
+@sections.section()
+def formulario_suma():
+    with st.form("suma"): #with manera de python de manejar automaticamente memoryleaks rollo cuando abres cierras un doc de I/O. Se usa para: forms, columnas y container
+        a = st.number_input("a", step=1.0)
+        b = st.number_input("b", step=1.0)
+        submitted = st.form_submit_button("Sumar")
 
-if submitted:
-    st.write("Resultado:", a + b)
+    if submitted:
+        st.write("Resultado:", a + b)
+formulario_suma()
 
 # --
 
-def get_data():
-    df = pd.DataFrame({
-        "lat": np.random.randn(200) / 50 + 37.76,
-        "lon": np.random.randn(200) / 50 + -122.4,
-        "team": ['A','B']*100
-    })
-    return df
-
-if st.button('Generate new points'):
-    st.session_state.df = get_data()
-if 'df' not in st.session_state:
-    st.session_state.df = get_data()
-df = st.session_state.df
-
-with st.form("my_form"):
-    header = st.columns([1,2,2])
-    header[0].subheader('Color')
-    header[1].subheader('Opacity')
-    header[2].subheader('Size')
-
-    row1 = st.columns([1,2,2])
-    colorA = row1[0].color_picker('Team A', '#0000FF')
-    opacityA = row1[1].slider('A opacity', 20, 100, 50, label_visibility='hidden')
-    sizeA = row1[2].slider('A size', 50, 200, 100, step=10, label_visibility='hidden')
-
-    row2 = st.columns([1,2,2])
-    colorB = row2[0].color_picker('Team B', '#FF0000')
-    opacityB = row2[1].slider('B opacity', 20, 100, 50, label_visibility='hidden')
-    sizeB = row2[2].slider('B size', 50, 200, 100, step=10, label_visibility='hidden')
-
-    st.form_submit_button('Update map')
-
-alphaA = int(opacityA*255/100)
-alphaB = int(opacityB*255/100)
-
-df['color'] = np.where(df.team=='A',colorA+f'{alphaA:02x}',colorB+f'{alphaB:02x}')
-df['size'] = np.where(df.team=='A',sizeA, sizeB)
-
-st.map(df, size='size', color='color')
+@sections.section(writes=["df"])
+def mapa():
+    def get_data():
+        rng = np.random.default_rng()  # puntos nuevos en cada click, sin tocar el RNG global
+        df = pd.DataFrame({
+            "lat": rng.standard_normal(200) / 50 + 37.76,
+            "lon": rng.standard_normal(200) / 50 + -122.4,
+            "team": ['A','B']*100
+        })
+        return df
+
+    if st.button('Generate new points'):
+        st.session_state.df = get_data()
+    if 'df' not in st.session_state:
+        st.session_state.df = get_data()
+    df = st.session_state.df
+
+    with st.form("my_form"):
+        header = st.columns([1,2,2])
+        header[0].subheader('Color')
+        header[1].subheader('Opacity')
+        header[2].subheader('Size')
+
+        row1 = st.columns([1,2,2])
+        colorA = row1[0].color_picker('Team A', '#0000FF')
+        opacityA = row1[1].slider('A opacity', 20, 100, 50, label_visibility='hidden')
+        sizeA = row1[2].slider('A size', 50, 200, 100, step=10, label_visibility='hidden')
+
+        row2 = st.columns([1,2,2])
+        colorB = row2[0].color_picker('Team B', '#FF0000')
+        opacityB = row2[1].slider('B opacity', 20, 100, 50, label_visibility='hidden')
+        sizeB = row2[2].slider('B size', 50, 200, 100, step=10, label_visibility='hidden')
+
+        st.form_submit_button('Update map')
+
+    alphaA = int(opacityA*255/100)
+    alphaB = int(opacityB*255/100)
+
+    # Color como entero RGBA por equipo (sin un string por fila) y, si hay muchos puntos, agregados por zoom
+    rgba = category_rgba(df["team"], {"A": (colorA, alphaA), "B": (colorB, alphaB)})
+    size = np.where(df["team"] == "A", sizeA, sizeB)
+
+    render_map(df["lat"], df["lon"], rgba, size)
+mapa()
 
 # CALLBACK EN SUBMIT DE FORM → TEXTO EN PANTALLA
 st.subheader("Callback en submit de form")
@@ -283,17 +297,20 @@ Si `min` y `max` cambian dinámicamente, el valor del slider puede quedar fuera
 **Solución**: **ajusta (clamp)** el valor a `[min, max]` **antes** de dibujar el slider.
 """)
 # Valor por defecto
-if "z" not in st.session_state:
-    st.session_state.z = 5
+@sections.section(writes=["z"])
+def slider_dinamico():
+    if "z" not in st.session_state:
+        st.session_state.z = 5
 
-min_val = st.number_input("Min", 1, 5, key="min_z")
-max_val = st.number_input("Max", 6, 10, 10, key="max_z")
+    min_val = st.number_input("Min", 1, 5, key="min_z")
+    max_val = st.number_input("Max", 6, 10, 10, key="max_z")
 
-def clamp_slider_value():
-    # Nos aseguramos de que st.session_state.a esté dentro de [min_val, max_val]
-    st.session_state.z = max(min_val, min(max_val, st.session_state.z))
+    def clamp_slider_value():
+        # Nos aseguramos de que st.session_state.a esté dentro de [min_val, max_val]
+        st.session_state.z = max(min_val, min(max_val, st.session_state.z))
 
-# Ajusta antes de dibujar el slider
-clamp_slider_value()
+    # Ajusta antes de dibujar el slider
+    clamp_slider_value()
 
-st.slider("A", min_val, max_val, key="z") 
+    st.slider("A", min_val, max_val, key="z") 
+slider_dinamico()
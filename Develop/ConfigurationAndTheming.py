@@ -3,6 +3,7 @@ import streamlit.components.v1 as components
 import json
 import plotly.express as px #pip install plotly 
 import pandas as pd
+from utils.datasets import get_dataset
 
 st.set_page_config(page_title="Configuration & Theming", page_icon=":material/tune:")
 st.title("Configuration & Theming")
@@ -89,13 +90,7 @@ fig_cat = px.bar(
 st.plotly_chart(fig_cat, use_container_width=True)
 
 # Continuo: usará theme.chartSequentialColors
-import numpy as np
-np.random.seed(0)
-df_seq = pd.DataFrame({
-    "x": np.linspace(0, 10, 120),
-    "y": np.sin(np.linspace(0, 5*np.pi, 120)) + np.random.normal(0, 0.15, 120),
-})
-df_seq["z"] = (df_seq["y"] - df_seq["y"].min()) / (df_seq["y"].max() - df_seq["y"].min())
+df_seq = get_dataset("sine_noise")  # x, y (seno + ruido) y z (y normalizada), generado una vez
 
 fig_seq = px.scatter(
     df_seq,
@@ -1,5 +1,8 @@
 import streamlit as st
-from utils.bq import get_bq_project_id, run_bq
+from utils.bq import (
+    get_bq_project_id, get_disk_cache, get_refresh_scheduler, get_result_cache, get_single_flight,
+    run_bq, run_bq_stream,
+)
 
 
 #pip install google-cloud-bigquery google-auth
@@ -29,9 +32,35 @@ LIMIT 20
 
 sql = st.text_area("SQL a ejecutar en BigQuery", value=default_sql, height=160, key="bq_sql")
 
+stream = st.toggle("Streaming por páginas (para resultados grandes)", key="bq_stream")
+page_size = st.number_input("Filas por página", 100, 100_000, 5_000, step=100, key="bq_page_size", disabled=not stream)
+
 if st.button("Ejecutar", type="primary"):
-    df = run_bq(sql)
-    st.write(f"Filas devueltas: {len(df)}")
-    st.dataframe(df, hide_index=True)
+    if stream:
+        # Pintamos la primera página en cuanto llega y del resto solo contamos filas (no se guarda en RAM)
+        info = st.empty()
+        first = None
+        n_rows = 0
+        for chunk in run_bq_stream(sql, page_size=int(page_size)):
+            if first is None:
+                first = chunk
+                st.dataframe(first, hide_index=True)
+            n_rows += len(chunk)
+            info.write(f"Filas leídas: {n_rows}")
+        if first is None:
+            info.write("Filas leídas: 0")
+    else:
+        df = run_bq(sql)
+        st.write(f"Filas devueltas: {len(df)}")
+        st.dataframe(df, hide_index=True)
 else:
-    st.info("Escribe una SQL o pulsa Ejecutar.")
\ No newline at end of file
+    st.info("Escribe una SQL o pulsa Ejecutar.")
+
+with st.expander("Cache de resultados (compartido por todas las sesiones)"):
+    st.json(get_result_cache().stats())
+    st.caption("Cache en disco (Arrow IPC, sobrevive a reinicios):")
+    st.json(get_disk_cache().stats())
+    st.caption("Queries simultáneas agrupadas (single-flight):")
+    st.json(get_single_flight().stats())
+    st.caption("Refresco anticipado (solo queries de dashboard declaradas con dashboard_query):")
+    st.json(get_refresh_scheduler().stats())
@@ -1,8 +1,10 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
 import time
-from utils.state_sync import bind_local_to_global, init_global, mirror_global_to_local
+from utils.state_sync import GLOBALS
+from utils.filter_index import get_group_score_index
+from utils.datasets import dataset_version, get_dataset
+from utils.map_render import pack_rgba, render_map
 
 st.set_page_config(page_title="Fundamentals", page_icon=":material/school:")
 
@@ -12,42 +14,37 @@ st.write("Esta página tiene **controles locales** que sincronizan con el **esta
 #---------------------------------
 #SINCRONIZACIÓN VARIABLES GLOBALES
 
-# --- Garantiza que existen las claves globales (por si se entra directo por URL) ---
-init_global("global_group", "A")
-init_global("global_threshold", 50)
-
-# --- ANTES de dibujar widgets: copia global -> local SIEMPRE ---
-mirror_global_to_local("_local_group", "global_group")
-mirror_global_to_local("_local_threshold", "global_threshold")
-
-
-with st.expander("Controles locales (sincronizados con el estado global)", expanded=True):
-    st.selectbox(
-        "Group (local)",
-        ["A", "B", "C"],
-        key="_local_group",
-        on_change=bind_local_to_global("_local_group", "global_group")
-    )
-    st.slider(
-        "Threshold (local)",
-        0, 100,
-        key="_local_threshold",
-        on_change=bind_local_to_global("_local_threshold", "global_threshold")
-    )
-    st.caption("Cambiar aquí actualiza el estado global y afectará a otras páginas.")
-
-st.write("---")
-st.subheader("Datos dependientes del estado global")
-np.random.seed(0)
-df = pd.DataFrame({
-    "group": np.random.choice(["A","B","C"], size=200),
-    "score": np.random.randint(0, 101, size=200),
-})
-
-mask = (df["group"] == st.session_state["global_group"]) & (df["score"] >= st.session_state["global_threshold"])
-st.write(f"Filtro activo → group = **{st.session_state['global_group']}**, threshold ≥ **{st.session_state['global_threshold']}**")
-st.dataframe(df[mask].head(20), use_container_width=True)
-
+# Depende de globales compartidas: fragment que se actualiza solo si otra pestaña del usuario las cambia
+@GLOBALS.shared_section()
+def filtros_globales():
+    # --- ANTES de dibujar widgets: copia global -> local solo lo que cambió (crea las globales si faltan) ---
+    GLOBALS.sync({"_local_group": "global_group", "_local_threshold": "global_threshold"})
+
+    with st.expander("Controles locales (sincronizados con el estado global)", expanded=True):
+        st.selectbox(
+            "Group (local)",
+            ["A", "B", "C"],
+            key="_local_group",
+            on_change=GLOBALS.bind("_local_group", "global_group")
+        )
+        st.slider(
+            "Threshold (local)",
+            0, 100,
+            key="_local_threshold",
+            on_change=GLOBALS.bind("_local_threshold", "global_threshold")
+        )
+        st.caption("Cambiar aquí actualiza el estado global y afectará a otras páginas.")
+
+    st.write("---")
+    st.subheader("Datos dependientes del estado global")
+    # Dataset compartido: se genera una vez por proceso (utils/datasets.py), no en cada rerun
+    df = get_dataset("scores_200")
+
+    # Índice (grupo, score) construido una vez por versión del dataset: el filtro es búsqueda binaria + slice
+    index = get_group_score_index("scores_200", dataset_version("scores_200"), df)
+    st.write(f"Filtro activo → group = **{st.session_state['global_group']}**, threshold ≥ **{st.session_state['global_threshold']}**")
+    st.dataframe(index.filter(df, st.session_state["global_group"], st.session_state["global_threshold"], limit=20), use_container_width=True)
+filtros_globales()
 
 
 #---------------------------------
@@ -68,10 +65,7 @@ df
 st.header("Ejemplo visualización rápida")
 
 # Datos aleatorios
-df = pd.DataFrame(
-    np.random.randn(20, 2),
-    columns=["x", "y"]
-)
+df = get_dataset("randn_xy")
 
 st.subheader("DataFrame interactivo")
 st.dataframe(df)
@@ -84,17 +78,14 @@ st.line_chart(df["x"])
 st.subheader("Bar chart de la columna y")
 st.bar_chart(df["y"])
 
-dataframe = pd.DataFrame(
-    np.random.randn(10, 20),
-    columns=('col %d' % i for i in range(20)))
+dataframe = get_dataset("randn_wide")
 
 st.dataframe(dataframe.style.highlight_max(axis=0))
 
-map_data = pd.DataFrame(
-    np.random.randn(1000, 2) / [50, 50] + [37.76, -122.4],
-    columns=['lat', 'lon'])
+map_data = get_dataset("sf_points")
 
-st.map(map_data)
+# Equivalente a st.map(map_data), pero agrega los puntos en el servidor cuando son demasiados
+render_map(map_data["lat"], map_data["lon"], pack_rgba("#4BA3FF", 200), size=60)
 
 x = st.slider('x')  # 👈 this is a widget
 st.write(x, 'squared is', x * x)
@@ -108,9 +99,7 @@ st.session_state.name
 asd = st.checkbox('Show dataframe')
 
 if asd:
-    chart_data = pd.DataFrame(
-       np.random.randn(20, 3),
-       columns=['a', 'b', 'c'])
+    chart_data = get_dataset("randn_abc")
 
     chart_data
 
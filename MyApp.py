@@ -1,6 +1,9 @@
 import streamlit as st
-from utils.state_sync import init_global
-from utils.auth import is_allowed_email
+from utils.state_sync import GLOBALS
+from utils.auth import (
+    SESSION_TOKEN_PARAM, allow_login_attempt, get_allow_list, is_allowed_email,
+    issue_session_token, normalize_email, revoke_session_token, verify_session_token,
+)
 
 # INSTALLATION:
 #python <= 3.12
@@ -9,19 +12,38 @@ from utils.auth import is_allowed_email
 
 st.set_page_config(page_title="MyApp", page_icon=":material/apps:")
 
-# VARIABLES GLOBALES (COMPARTIDAS ENTRE PÁGINAS)
-init_global("global_group", "A")
-init_global("global_threshold", 50)
+# VARIABLES GLOBALES (COMPARTIDAS ENTRE PÁGINAS): se declaran en utils/state_sync.py (GLOBALS)
+GLOBALS.init()
  
+# Carga (una vez por proceso) el índice de correos autorizados, así el primer login ya no espera a BigQuery
+get_allow_list()
+
 if "user_email" not in st.session_state:
     st.session_state.user_email = None
+    st.session_state.session_token = None
+
+# Reanudar sesión tras reconexión/recarga: el token firmado de la URL se verifica en local (sin BigQuery)
+if st.session_state.user_email is None:
+    token = st.query_params.get(SESSION_TOKEN_PARAM)
+    email = verify_session_token(token)
+    if email:
+        st.session_state.user_email = email
+        st.session_state.session_token = token
+
+# Al cambiar de página Streamlit limpia los query params: volvemos a poner el token
+if st.session_state.session_token and st.query_params.get(SESSION_TOKEN_PARAM) != st.session_state.session_token:
+    st.query_params[SESSION_TOKEN_PARAM] = st.session_state.session_token
 
 def login_page():
     st.title("Log in")
     email = st.text_input("Correo corporativo / Gmail", key="login_email")
     if st.button("Entrar", type="primary"):
-        if is_allowed_email(email):
-            st.session_state.user_email = email.strip()
+        if not allow_login_attempt():
+            st.error("Demasiados intentos. Espera unos segundos y vuelve a probar.")
+        elif is_allowed_email(email):
+            # Mismo formato que el token (minúsculas): la sesión nueva y la reanudada son el mismo usuario
+            st.session_state.user_email = normalize_email(email)
+            st.session_state.session_token = issue_session_token(email)
             st.rerun()
         else:
             st.error("Este correo no está autorizado.")
@@ -30,7 +52,10 @@ def logout_page():
     st.title("Log out")
     st.write(f"Sesión: {st.session_state.user_email}")
     if st.button("Log out"):
+        revoke_session_token(st.session_state.session_token)
         st.session_state.user_email = None
+        st.session_state.session_token = None
+        st.query_params.pop(SESSION_TOKEN_PARAM, None)
         st.rerun()
 
 #Get started
@@ -45,6 +70,7 @@ configurationAndTheming_page = st.Page("Develop/ConfigurationAndTheming.py", tit
 apiRefence_page = st.Page("Develop/ApiReference.py", title="API Reference", icon=":material/dictionary:")
 
 if st.session_state.user_email:
+    GLOBALS.pull()  # filtros compartidos que cambió otra pestaña (las secciones que dependen de ellos siguen atentas solas)
     pg = st.navigation(
         {
             "Account": [logout_page],
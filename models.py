@@ -1,25 +1,117 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
+import io
+import numpy as np
+import pandas as pd
 import streamlit as st
+from utils.http_client import HttpClient
+
+try:
+    import pyarrow as pa  # solo para ProductBatch.to_arrow / dumps (sin él, dumps usa .npz)
+except ImportError:
+    pa = None
 
 # 1) Ejemplo clase propia
-@dataclass(frozen=True)
+# slots=True: sin __dict__ por instancia (menos memoria y acceso a atributos más rápido)
+@dataclass(frozen=True, slots=True)
 class Product:
     id: int
     name: str
     price: float
 
-    def to_dict(self): 
-        return asdict(self)
+    def to_dict(self):
+        # asdict() copia recursivamente; con 3 campos planos basta un dict directo
+        return {"id": self.id, "name": self.name, "price": self.price}
 
     @classmethod
     def from_dict(cls, d: dict):
         return cls(**d)
 
-# Ejemplo Singleton
-class ApiClient:
-    def __init__(self, base_url: str):
-        self.base_url = base_url
+# 1b) Muchos productos a la vez: columnas NumPy en vez de miles de objetos
+# Para tener decenas de miles de productos en session_state/cache: 3 arrays en lugar de N objetos.
+# Construcción vectorizada desde DataFrame/resultado de query y vuelta a DataFrame sin copiar.
+class ProductBatch:
+    __slots__ = ("id", "name", "price")
+
+    def __init__(self, id, name, price):
+        self.id = np.asarray(id, dtype=np.int64)
+        self.name = np.asarray(name, dtype=object)
+        self.price = np.asarray(price, dtype=np.float64)
+        if not len(self.id) == len(self.name) == len(self.price):
+            raise ValueError("id, name y price deben tener la misma longitud")
+
+    def __len__(self):
+        return len(self.id)
+
+    def __getitem__(self, i) -> Product:
+        return Product(int(self.id[i]), self.name[i], float(self.price[i]))
+
+    def __iter__(self):
+        for id_, name, price in zip(self.id.tolist(), self.name.tolist(), self.price.tolist()):
+            yield Product(id_, name, price)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        """Desde un DataFrame (o el resultado de run_bq) con columnas id, name, price."""
+        return cls(df["id"].to_numpy(), df["name"].to_numpy(), df["price"].to_numpy())
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame que comparte los arrays (sin copia): no modificarlo si se sigue usando el batch."""
+        return pd.DataFrame({"id": self.id, "name": self.name, "price": self.price}, copy=False)
+
+    @classmethod
+    def from_products(cls, products):
+        products = list(products)
+        return cls([p.id for p in products], [p.name for p in products], [p.price for p in products])
+
+    def to_products(self) -> list:
+        return list(self)
 
+    @classmethod
+    def from_records(cls, records: list[dict]):
+        return cls.from_frame(pd.DataFrame.from_records(records, columns=["id", "name", "price"]))
+
+    def to_records(self) -> list[dict]:
+        return [{"id": i, "name": n, "price": p} for i, n, p in zip(self.id.tolist(), self.name.tolist(), self.price.tolist())]
+
+    def to_arrow(self):
+        _require_pyarrow()
+        return pa.table({"id": self.id, "name": pa.array(self.name, pa.string()), "price": self.price})
+
+    @classmethod
+    def from_arrow(cls, table):
+        _require_pyarrow()
+        return cls(table["id"].to_numpy(), table["name"].to_numpy(zero_copy_only=False), table["price"].to_numpy())
+
+    def dumps(self) -> bytes:
+        """
+        Serialización en bloque (Arrow IPC): mucho más compacta y rápida que N dicts en JSON/pickle.
+        Sin pyarrow: .npz de NumPy (names como texto de ancho fijo, sin pickle).
+        """
+        sink = io.BytesIO()
+        if pa is None:
+            np.savez(sink, id=self.id, name=self.name.astype(str), price=self.price)
+            return sink.getvalue()
+        table = self.to_arrow()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue()
+
+    @classmethod
+    def loads(cls, data: bytes):
+        if data[:2] == b"PK":  # .npz (zip) escrito sin pyarrow
+            with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+                return cls(npz["id"], npz["name"].astype(object), npz["price"])
+        _require_pyarrow()
+        return cls.from_arrow(pa.ipc.open_stream(data).read_all())
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("ProductBatch.to_arrow/from_arrow necesitan pyarrow (pip install pyarrow)")
+
+# Ejemplo Singleton
+# Un cliente por base_url para todo el proceso: todas las sesiones comparten pool de conexiones
+# keep-alive, reintentos, agrupación de peticiones y cache de respuestas (utils/http_client.py)
+class ApiClient(HttpClient):
     @st.cache_resource
     @staticmethod
     def get(base_url: str):
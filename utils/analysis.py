@@ -0,0 +1,14 @@
+import time
+import numpy as np
+import pandas as pd
+from utils.compute import compute_function
+
+# Cálculos pesados de las páginas. Viven en un módulo (no en la página) para que el pool de
+# procesos pueda importarlos: se ejecutan con run_compute("nombre", ...) (utils/compute.py).
+# Nada de st.* aquí: corren en otro proceso.
+
+@compute_function
+def expensive(size: int, add: int) -> pd.DataFrame:
+    time.sleep(2)  # simula trabajo pesado
+    # resultado cualquiera (p. ej., columna con rango + offset)
+    return pd.DataFrame({"x": np.arange(size), "y": np.full(size, add)})
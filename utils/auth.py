@@ -1,26 +1,308 @@
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from google.cloud import bigquery
 from utils.bq import run_bq_params
 
 ALLOWED_USERS_TABLE = st.secrets["auth"]["ALLOWED_USERS_TABLE"]
 
-def is_allowed_email(email: str) -> bool:
-    if not email:
-        return False
-    
-    email = email.strip().lower()
+# Índice en memoria de correos autorizados: se carga al arrancar y un hilo lo recarga cada
+# ALLOWLIST_SYNC_INTERVAL segundos. El login consulta un set (O(1)) en vez de lanzar una query.
+# Un correo borrado de la tabla deja de entrar como mucho tras un intervalo de sync.
+# Si el índice lleva demasiado sin sincronizar (BigQuery caído...) se vuelve a la query directa,
+# para no dar por buenas autorizaciones antiguas.
+ALLOWLIST_SYNC_INTERVAL = 60  # segundos
+ALLOWLIST_MAX_STALENESS = 3 * ALLOWLIST_SYNC_INTERVAL
+
+def normalize_email(email: str) -> str:
+    return (email or "").strip().lower()
+
+class AllowList:
+    def __init__(self, table: str, interval: float = ALLOWLIST_SYNC_INTERVAL,
+                 max_staleness: float = ALLOWLIST_MAX_STALENESS):
+        self.table = table
+        self.interval = interval
+        self.max_staleness = max_staleness
+        self._emails = frozenset()
+        self.synced_at = None  # time.monotonic() del último sync correcto
+        self.syncs = self.sync_errors = 0
+        self._stop = threading.Event()
+        self.sync()
+        threading.Thread(target=self._loop, daemon=True, name="allowlist-sync").start()
+
+    def sync(self):
+        """Recarga la tabla completa y sustituye el set de golpe (los lectores nunca ven uno a medias)."""
+        sql = f"SELECT DISTINCT LOWER(email) AS email FROM `{self.table}`"
+        try:
+            rows = run_bq_params(sql, [])
+            self._emails = frozenset(row[0] for row in rows if row[0])
+        except Exception:
+            self.sync_errors += 1
+            return
+        self.synced_at = time.monotonic()
+        self.syncs += 1
+
+    @property
+    def ready(self) -> bool:
+        return self.synced_at is not None and time.monotonic() - self.synced_at <= self.max_staleness
+
+    def __contains__(self, email: str) -> bool:
+        return normalize_email(email) in self._emails
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.sync()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        age = None if self.synced_at is None else round(time.monotonic() - self.synced_at, 1)
+        return {"emails": len(self._emails), "ready": self.ready, "age_s": age,
+                "syncs": self.syncs, "sync_errors": self.sync_errors}
+
+@st.cache_resource
+def get_allow_list() -> AllowList:
+    return AllowList(ALLOWED_USERS_TABLE)
+
+# --- CACHE NEGATIVO Y LÍMITE DE INTENTOS ---
+# Los correos rechazados se recuerdan NEGATIVE_TTL segundos: un typo repetido o un script probando
+# el mismo correo no vuelve a consultar. Solo se cachean rechazos (nunca autorizaciones) y por poco
+# tiempo, así que un alta nueva tarda como mucho NEGATIVE_TTL en poder entrar.
+# Además, un token bucket por sesión y otro por IP limitan cuántos intentos se aceptan.
+NEGATIVE_TTL = 60  # segundos
+NEGATIVE_MAX_ENTRIES = 10_000
+LOGIN_RATE_SESSION = (0.2, 5)   # (tokens por segundo, ráfaga máxima): 5 seguidos y luego 1 cada 5s
+LOGIN_RATE_IP = (1.0, 20)       # más permisivo: varios usuarios pueden compartir IP (NAT, oficina)
+
+class NegativeCache:
+    def __init__(self, ttl: float = NEGATIVE_TTL, max_entries: int = NEGATIVE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # email -> expires_at
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def __contains__(self, email: str) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(email)
+            if expires_at is not None and expires_at > time.monotonic():
+                self.hits += 1
+                return True
+            self._entries.pop(email, None)
+            self.misses += 1
+            return False
+
+    def add(self, email: str):
+        with self._lock:
+            self._entries[email] = time.monotonic() + self.ttl
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+class TokenBucketLimiter:
+    """Un bucket por clave: se rellena a `rate` tokens/s hasta `burst`; cada intento gasta uno."""
+    def __init__(self, rate: float, burst: int, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, last)
+        self._lock = threading.Lock()
+        self.allowed = self.throttled = 0
+
+    def allow(self, key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            ok = tokens >= 1
+            if ok:
+                tokens -= 1
+                self.allowed += 1
+            else:
+                self.throttled += 1
+            self._buckets[key] = (tokens, now)  # al final: el más reciente
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return ok
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"keys": len(self._buckets), "allowed": self.allowed, "throttled": self.throttled}
+
+@st.cache_resource
+def get_negative_cache() -> NegativeCache:
+    return NegativeCache()
+
+@st.cache_resource
+def get_login_limiters() -> dict:
+    return {"session": TokenBucketLimiter(*LOGIN_RATE_SESSION), "ip": TokenBucketLimiter(*LOGIN_RATE_IP)}
+
+def allow_login_attempt() -> bool:
+    """Consume un intento de los buckets de esta sesión y de su IP. False = demasiados intentos."""
+    limiters = get_login_limiters()
+    ctx = get_script_run_ctx()
+    ok = limiters["session"].allow(ctx.session_id if ctx else "unknown")
+    ip = getattr(st.context, "ip_address", None)
+    if ip:
+        ok = limiters["ip"].allow(ip) and ok
+    return ok
+
+def login_guard_stats() -> dict:
+    limiters = get_login_limiters()
+    return {
+        "negative_cache": get_negative_cache().stats(),
+        "rate_session": limiters["session"].stats(),
+        "rate_ip": limiters["ip"].stats(),
+    }
 
+def _query_allowed_email(email: str) -> bool:
     sql = f"""
     SELECT 1
     FROM `{ALLOWED_USERS_TABLE}`
     WHERE LOWER(email) = @email
     LIMIT 1
     """
-    
+
     params = [
         bigquery.ScalarQueryParameter("email", "STRING", email)
     ]
-    
+
     result = run_bq_params(sql, params)
 
     return result.total_rows > 0
+
+def is_allowed_email(email: str) -> bool:
+    email = normalize_email(email)
+    if not email:
+        return False
+
+    negative = get_negative_cache()
+    if email in negative:
+        return False
+
+    allow_list = get_allow_list()
+    allowed = email in allow_list if allow_list.ready else _query_allowed_email(email)
+    if not allowed:
+        negative.add(email)
+    return allowed
+
+# --- REANUDAR SESIÓN CON TOKEN FIRMADO ---
+# Al hacer login se emite un token "email|caducidad" firmado con HMAC-SHA256 (secreto en
+# [auth] SESSION_SECRET) y se guarda en la URL (?session=...). Si se cae el websocket o se recarga
+# la pestaña, MyApp lo verifica en local y recupera user_email sin volver a consultar BigQuery.
+# Streamlit no puede escribir cookies sin JS, por eso va en query param.
+# Además del HMAC se comprueba el índice en memoria: un correo dado de baja no reanuda sesión.
+# Sin [auth] SESSION_SECRET en secrets.toml no se emiten tokens: el login funciona igual, pero al
+# recargar la pestaña hay que volver a entrar. Generar uno con: python -c "import secrets; print(secrets.token_hex(32))"
+SESSION_TOKEN_TTL = 12 * 3600  # segundos
+SESSION_TOKEN_PARAM = "session"
+
+def _session_secret() -> bytes | None:
+    secret = st.secrets.get("auth", {}).get("SESSION_SECRET")
+    return secret.encode("utf-8") if secret else None
+
+def _sign(body: str, secret: bytes) -> str:
+    return hmac.new(secret, body.encode("ascii"), hashlib.sha256).hexdigest()
+
+class SessionTokenCache:
+    """Tokens ya verificados (token -> (email, caducidad)) y tokens revocados al hacer logout."""
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._verified = OrderedDict()
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, token: str):
+        with self._lock:
+            entry = self._verified.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+
+    def add(self, token: str, email: str, expires_at: float):
+        with self._lock:
+            self._verified[token] = (email, expires_at)
+            while len(self._verified) > self.max_entries:
+                self._verified.popitem(last=False)
+
+    def revoke(self, token: str, expires_at: float):
+        with self._lock:
+            self._verified.pop(token, None)
+            now = time.time()
+            self._revoked = {t: exp for t, exp in self._revoked.items() if exp > now}  # purga los caducados
+            self._revoked[token] = expires_at
+
+    def is_revoked(self, token: str) -> bool:
+        return token in self._revoked
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"verified": len(self._verified), "revoked": len(self._revoked), "hits": self.hits, "misses": self.misses}
+
+@st.cache_resource
+def get_session_token_cache() -> SessionTokenCache:
+    return SessionTokenCache()
+
+def issue_session_token(email: str, ttl: float = SESSION_TOKEN_TTL) -> str | None:
+    """None si no hay SESSION_SECRET configurado (sesión sin reanudación)."""
+    secret = _session_secret()
+    if secret is None:
+        return None
+    payload = f"{normalize_email(email)}|{int(time.time() + ttl)}"
+    body = base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+    return f"{body}.{_sign(body, secret)}"
+
+def _decode_session_token(token: str):
+    """Devuelve (email, caducidad) si la firma es válida, si no None."""
+    secret = _session_secret()
+    if secret is None or not token.isascii():  # viene de la URL: cualquier cosa puede llegar
+        return None
+    body, _, sig = token.partition(".")
+    if not sig or not hmac.compare_digest(sig, _sign(body, secret)):
+        return None
+    try:
+        payload = base64.urlsafe_b64decode(body + "=" * (-len(body) % 4)).decode("utf-8")
+        email, expires_at = payload.rsplit("|", 1)
+        return email, float(expires_at)
+    except ValueError:
+        return None
+
+def verify_session_token(token: str | None) -> str | None:
+    """Devuelve el email del token si es válido, no ha caducado, no está revocado y sigue autorizado."""
+    if not token:
+        return None
+    cache = get_session_token_cache()
+    if cache.is_revoked(token):
+        return None
+    entry = cache.get(token)
+    if entry is None:
+        entry = _decode_session_token(token)
+        if entry is None:
+            return None
+        cache.add(token, *entry)
+    email, expires_at = entry
+    if expires_at <= time.time():
+        return None
+    # Índice sin cargar: se consulta BigQuery, nunca se confía en una autorización sin comprobar
+    allow_list = get_allow_list()
+    allowed = email in allow_list if allow_list.ready else _query_allowed_email(email)
+    return email if allowed else None
+
+def revoke_session_token(token: str | None):
+    entry = token and _decode_session_token(token)
+    if entry:
+        get_session_token_cache().revoke(token, entry[1])
+
@@ -1,7 +1,16 @@
+import datetime
 import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
 import streamlit as st
 from google.oauth2 import service_account
 from google.cloud import bigquery
+from utils.bq_backends import SQLiteBqClient
+from utils.disk_cache import DiskCache
+from utils.result_cache import ResultCache
+from utils.singleflight import SingleFlight
 
 #https://docs.streamlit.io/develop/tutorials/databases/bigquery
 #pip install db.dtypes para poder hacer to_dataframe()
@@ -10,25 +19,370 @@ def _load_sa_info() -> dict:
     sa_json_str = st.secrets["gcp_service_account"]["json"]
     return json.loads(sa_json_str)
 
+# Backend de consultas (ver utils/bq_backends.py):
+#   BQ_BACKEND=bigquery (por defecto) -> BigQuery con la service account de secrets
+#   BQ_BACKEND=sqlite                 -> base local en BQ_SQLITE_PATH, sin GCP
+def get_bq_backend() -> str:
+    return os.environ.get("BQ_BACKEND", "bigquery")
+
 def get_bq_project_id() -> str:
+    if get_bq_backend() == "sqlite":
+        return SQLiteBqClient.project
     sa_info = _load_sa_info()
     return sa_info["project_id"]
 
 @st.cache_resource
 def get_bq_client() -> bigquery.Client:
+    backend = get_bq_backend()
+    if backend == "sqlite":
+        return SQLiteBqClient(os.environ.get("BQ_SQLITE_PATH", "local.db"))
+    if backend != "bigquery":
+        raise ValueError(f"BQ_BACKEND desconocido: {backend}")
     sa_info = _load_sa_info()
     credentials = service_account.Credentials.from_service_account_info(sa_info)
     return bigquery.Client(credentials=credentials, project=sa_info["project_id"])
 
-@st.cache_data(ttl=600)
-def run_bq(sql: str):
+# --- CACHE DE RESULTADOS ---
+# Sustituye a @st.cache_data(ttl=600): aquel no tenía límite de entradas ni de memoria.
+# Este cache es único por proceso (cache_resource), tiene presupuesto de bytes, TTL por entrada,
+# expulsión LRU (o LFU) y contadores de hits/misses/evictions (utils/result_cache.py).
+
+BQ_CACHE_MAX_BYTES = 256 * 1024 * 1024
+BQ_CACHE_TTL = 600  # segundos
+
+def normalize_sql(sql: str) -> str:
+    """
+    Quita espacios al principio/final y el ';' final. El resto se deja tal cual: colapsar espacios
+    cambiaría literales ('a  b' vs 'a b') y comentarios '--', y dos queries distintas compartirían entrada.
+    """
+    return sql.strip().rstrip(";").strip()
+
+def query_key(sql: str, params=None) -> str:
+    """Clave de cache: SQL normalizada + parámetros enlazados (nombre, tipo y valor)."""
+    bound = [p.to_api_repr() for p in params or []]
+    return json.dumps([normalize_sql(sql), bound], sort_keys=True, default=str)
+
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    return ResultCache(BQ_CACHE_MAX_BYTES, BQ_CACHE_TTL)
+
+@st.cache_resource
+def get_disk_cache() -> DiskCache:
+    """Segundo nivel (disco, Arrow IPC): sobrevive a reinicios del servidor."""
+    return DiskCache()
+
+# --- SINGLE-FLIGHT ---
+# Si varias sesiones piden a la vez la misma query (misma clave), solo la primera la lanza (utils/singleflight.py).
+
+@st.cache_resource
+def get_single_flight() -> SingleFlight:
+    return SingleFlight()
+
+def _submit_query(sql: str, params=None):
     client = get_bq_client()
-    job = client.query(sql)
-    return job.result().to_dataframe()
+    job_config = bigquery.QueryJobConfig(query_parameters=params) if params else None
+    return client.query(sql, job_config=job_config)
+
+def _fetch_df(key: str, sql: str, params=None, ttl: float | None = None):
+    """Va siempre a BigQuery y publica el resultado en memoria (cache.set es atómico) y después en disco."""
+    df = _submit_query(sql, params).result().to_dataframe()
+    get_result_cache().set(key, df, ttl=ttl)
+    get_disk_cache().put(key, df)  # si no se puede guardar en disco se sirve igual desde memoria
+    return df
+
+def run_bq(sql: str, params: list[bigquery.ScalarQueryParameter] | None = None, ttl: float | None = None):
+    """
+    Ejecuta la query y devuelve un DataFrame, usando el cache de resultados.
+    El DataFrame devuelto es compartido entre sesiones: trátalo como solo lectura.
+    """
+    cache = get_result_cache()
+    key = query_key(sql, params)
+    scheduler = get_refresh_scheduler()
+    scheduler.touch(key)  # las registradas que nadie lee dejan de refrescarse
+    df = cache.get(key, keep_stale=scheduler.is_registered(key))
+    if df is not None:
+        return df
+
+    # Queries registradas para refresco anticipado: si ha caducado devolvemos el valor anterior
+    # y se refresca en segundo plano (stale-while-revalidate)
+    if scheduler.is_registered(key):
+        stale = cache.peek(key)
+        if stale is not None:
+            scheduler.refresh_async(key)
+            return stale
+
+    def load():
+        # Otro líder pudo rellenar el cache entre nuestro get() y entrar aquí
+        df = cache.get(key)
+        if df is not None:
+            return df
+        # Memoria -> disco -> BigQuery. En disco solo vale si es más reciente que el TTL.
+        df = get_disk_cache().get(key, max_age=BQ_CACHE_TTL if ttl is None else ttl)
+        if df is None:
+            return _fetch_df(key, sql, params, ttl)
+        cache.set(key, df, ttl=ttl)
+        return df
+
+    return get_single_flight().do("df:" + key, load)
+
+# --- REFRESCO ANTICIPADO (REFRESH-AHEAD) ---
+# Las queries de las que dependen los dashboards se registran una vez. Un hilo en segundo plano
+# las vuelve a lanzar `lead` segundos antes de que caduque su TTL; mientras tanto los lectores
+# siguen recibiendo el valor anterior y el nuevo se publica de golpe al terminar.
+# Así ningún usuario se encuentra el cache frío o caducado para esas queries.
+# Solo queries declaradas en código (dashboard_query), nunca SQL escrita en la página, y acotado:
+# - como mucho BQ_REFRESH_MAX_JOBS registradas,
+# - una query que nadie ha leído en BQ_REFRESH_IDLE_TTLS TTLs se da de baja (run_dashboard_query
+#   la vuelve a registrar en la siguiente lectura).
+
+BQ_REFRESH_LEAD = 60  # segundos antes del fin del TTL
+BQ_REFRESH_TICK = 5   # cada cuánto revisa el hilo
+BQ_REFRESH_MAX_JOBS = 50
+BQ_REFRESH_IDLE_TTLS = 3
+
+class RefreshScheduler:
+    def __init__(self, lead: float = BQ_REFRESH_LEAD, tick: float = BQ_REFRESH_TICK):
+        self.lead = lead
+        self.tick = tick
+        self._jobs = {}  # key -> {"sql", "params", "ttl", "due", "running", "last_read"}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.refreshes = self.failures = self.expired = 0
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="bq-refresh")
+        self._thread.start()
+
+    def register(self, sql: str, params=None, ttl: float | None = None) -> str:
+        """Registra la query y lanza ya su primera carga. Devuelve la clave de cache."""
+        key = query_key(sql, params)
+        with self._lock:
+            if key in self._jobs:
+                return key
+            if len(self._jobs) >= BQ_REFRESH_MAX_JOBS:
+                raise RuntimeError(f"Máximo de {BQ_REFRESH_MAX_JOBS} queries con refresco anticipado")
+            self._jobs[key] = {"sql": sql, "params": params, "ttl": ttl, "due": 0.0, "running": False,
+                               "last_read": time.monotonic()}
+        self.refresh_async(key)
+        return key
+
+    def touch(self, key: str):
+        job = self._jobs.get(key)
+        if job is not None:
+            job["last_read"] = time.monotonic()
+
+    def unregister(self, key: str):
+        with self._lock:
+            self._jobs.pop(key, None)
+
+    def is_registered(self, key: str) -> bool:
+        return key in self._jobs
+
+    def refresh_async(self, key: str):
+        """Lanza el refresco en el pool de BigQuery si no hay ya uno en marcha para esa clave."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job["running"]:
+                return
+            job["running"] = True
+        get_bq_executor().submit(self._refresh, key, job)
+
+    def _refresh(self, key: str, job: dict):
+        ttl = BQ_CACHE_TTL if job["ttl"] is None else job["ttl"]
+        try:
+            get_single_flight().do("df:" + key, lambda: _fetch_df(key, job["sql"], job["params"], job["ttl"]))
+            self.refreshes += 1
+            job["due"] = time.monotonic() + max(ttl - self.lead, 0)
+        except Exception:
+            self.failures += 1
+            job["due"] = time.monotonic() + self.tick  # reintento en el siguiente tick
+        finally:
+            job["running"] = False
+
+    def _loop(self):
+        while not self._stop.wait(self.tick):
+            now = time.monotonic()
+            with self._lock:
+                for key, job in list(self._jobs.items()):
+                    ttl = BQ_CACHE_TTL if job["ttl"] is None else job["ttl"]
+                    if now - job["last_read"] > BQ_REFRESH_IDLE_TTLS * ttl:
+                        del self._jobs[key]  # nadie la lee: deja de gastar BigQuery
+                        self.expired += 1
+                due = [key for key, job in self._jobs.items() if not job["running"] and job["due"] <= now]
+            for key in due:
+                self.refresh_async(key)
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"registered": len(self._jobs), "max": BQ_REFRESH_MAX_JOBS, "refreshes": self.refreshes,
+                    "failures": self.failures, "expired": self.expired}
+
+@st.cache_resource
+def get_refresh_scheduler() -> RefreshScheduler:
+    return RefreshScheduler()
+
+_DASHBOARD_QUERIES = {}  # nombre -> (sql, params, ttl)
+
+def dashboard_query(name: str, sql: str, params: list[bigquery.ScalarQueryParameter] | None = None,
+                    ttl: float | None = None):
+    """Declara (en código, a nivel de módulo) una query de dashboard que se mantiene caliente."""
+    _DASHBOARD_QUERIES[name] = (sql, params, ttl)
+
+def register_refresh(name: str) -> str:
+    """Mantiene caliente el resultado de una query declarada: se refresca solo antes de caducar."""
+    sql, params, ttl = _DASHBOARD_QUERIES[name]
+    return get_refresh_scheduler().register(sql, params, ttl)
+
+def run_dashboard_query(name: str):
+    """run_bq de una query declarada, registrándola (otra vez si se dio de baja por no usarse)."""
+    sql, params, ttl = _DASHBOARD_QUERIES[name]
+    try:
+        register_refresh(name)
+    except RuntimeError:
+        pass  # cupo lleno: se sirve igual, sin refresco anticipado
+    return run_bq(sql, params, ttl)
+
+# --- REFRESCO INCREMENTAL (WATERMARK) ---
+# Para tablas donde casi solo se añaden filas: al caducar no se relee todo, solo las filas con
+# watermark > máximo ya cacheado, y se añaden al DataFrame. El coste del refresco depende de lo nuevo.
+# Supone que la columna watermark solo crece (id autoincremental, timestamp de carga...).
+
+def _watermark_param(value) -> bigquery.ScalarQueryParameter:
+    if isinstance(value, bool):
+        type_ = "BOOL"
+    elif isinstance(value, int) or (hasattr(value, "dtype") and value.dtype.kind in "iu"):
+        type_, value = "INT64", int(value)
+    elif isinstance(value, float) or (hasattr(value, "dtype") and value.dtype.kind == "f"):
+        type_, value = "FLOAT64", float(value)
+    elif isinstance(value, datetime.datetime):
+        type_ = "TIMESTAMP"
+    elif isinstance(value, datetime.date):
+        type_ = "DATE"
+    else:
+        type_ = "STRING"
+    return bigquery.ScalarQueryParameter("_watermark", type_, value)
+
+def run_bq_incremental(sql: str, watermark: str, params: list[bigquery.ScalarQueryParameter] | None = None,
+                       ttl: float | None = None):
+    """
+    Como run_bq, pero al caducar solo pide las filas nuevas (watermark > máximo cacheado).
+    La primera vez (o si la entrada se expulsó del cache) hace la carga completa.
+    """
+    import pandas as pd
+    cache = get_result_cache()
+    key = "inc:" + watermark + ":" + query_key(sql, params)
+    df = cache.get(key, keep_stale=True)  # la copia caducada es la base del refresco incremental
+    if df is not None:
+        return df
+
+    def load():
+        df = cache.get(key, keep_stale=True)
+        if df is not None:
+            return df
+        old = cache.peek(key)
+        if old is None or old.empty:
+            df = _submit_query(sql, params).result().to_dataframe()
+        else:
+            high = old[watermark].max()
+            # La SQL original en sus propias líneas: un comentario '--' no se come el WHERE
+            delta_sql = f"SELECT * FROM (\n{sql}\n) WHERE `{watermark}` > @_watermark"
+            delta_params = list(params or []) + [_watermark_param(high)]
+            delta = _submit_query(delta_sql, delta_params).result().to_dataframe()
+            df = old if delta.empty else pd.concat([old, delta], ignore_index=True)
+        cache.set(key, df, ttl=ttl)
+        return df
+
+    return get_single_flight().do(key, load)
+
+
+# --- VARIAS QUERIES EN PARALELO ---
+# Las páginas con varias queries independientes las lanzan a la vez en un pool acotado:
+# la latencia pasa a ser la de la query más lenta en vez de la suma de todas.
+
+BQ_MAX_WORKERS = 8
+
+@st.cache_resource
+def get_bq_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=BQ_MAX_WORKERS, thread_name_prefix="bq")
+
+def submit_bq(sql: str, params: list[bigquery.ScalarQueryParameter] | None = None, ttl: float | None = None) -> Future:
+    """Lanza run_bq en el pool y devuelve un Future con el DataFrame."""
+    return get_bq_executor().submit(run_bq, sql, params, ttl)
+
+def run_bq_many(queries: list, timeout: float | None = None, return_exceptions: bool = False) -> list:
+    """
+    Ejecuta varias queries a la vez y devuelve sus DataFrames en el mismo orden.
+    - queries: lista de sql o de tuplas (sql, params).
+    - timeout: segundos máximos por query, contados desde el lanzamiento. Si vence se lanza TimeoutError
+      (el job de BigQuery no se cancela, solo dejamos de esperarlo).
+    - return_exceptions: si es True, los errores se devuelven en la lista en vez de lanzarse.
+    """
+    started = time.monotonic()
+    futures = []
+    for q in queries:
+        sql, params = (q, None) if isinstance(q, str) else q
+        futures.append(submit_bq(sql, params))
+
+    results = []
+    try:
+        for fut in futures:
+            remaining = None if timeout is None else max(0.0, started + timeout - time.monotonic())
+            try:
+                results.append(fut.result(timeout=remaining))
+            except Exception as e:
+                if isinstance(e, TimeoutError):
+                    fut.cancel()  # si aún no había empezado, no llega a ejecutarse
+                if not return_exceptions:
+                    raise
+                results.append(e)
+    finally:
+        if len(results) < len(futures):
+            for fut in futures:
+                fut.cancel()
+    return results
 
 #para auth, no hacemos cache data para q no quede guardado un correo q despues se elimine de la tabla o algo
+#(para queries con parámetros que sí se pueden cachear: run_bq(sql, params))
+#Las llamadas simultáneas con la misma sql+params comparten el job (single-flight), pero cada una
+#obtiene su propio iterador con job.result(). Al terminar no se guarda nada.
 def run_bq_params(sql: str, params: list[bigquery.ScalarQueryParameter]):
-    client = get_bq_client()
-    job_config = bigquery.QueryJobConfig(query_parameters=params)
-    job = client.query(sql, job_config=job_config)
-    return job.result()
\ No newline at end of file
+    def submit_and_wait():
+        job = _submit_query(sql, params)
+        job.result()  # espera a que termine dentro del single-flight
+        return job
+
+    job = get_single_flight().do("job:" + query_key(sql, params), submit_and_wait)
+    return job.result()
+
+# --- STREAMING POR PÁGINAS ---
+# run_bq materializa todo el resultado en un DataFrame. Para resultados grandes usamos
+# run_bq_stream: pide el resultado página a página (page_size filas) y va devolviendo trozos,
+# así la página puede pintar las primeras filas enseguida y nunca tenemos toda la tabla en RAM.
+
+def _chunk_nbytes(chunk) -> int:
+    if hasattr(chunk, "memory_usage"):  # DataFrame
+        return int(chunk.memory_usage(deep=True).sum())
+    return int(chunk.nbytes)  # pyarrow.RecordBatch
+
+def run_bq_stream(sql: str, params=None, page_size: int = 10_000, max_bytes: int | None = None,
+                  as_arrow: bool = False, client=None):
+    """
+    Generador: ejecuta la query y devuelve el resultado por trozos (DataFrame o RecordBatch de Arrow).
+    - page_size: filas por página pedidas a BigQuery.
+    - max_bytes: presupuesto total de bytes; al superarlo se deja de leer (None = sin límite).
+    - client: por defecto get_bq_client(); se puede pasar LocalBqClient para probar sin GCP.
+    No se cachea: cada llamada vuelve a leer las páginas.
+    """
+    client = client or get_bq_client()
+    job_config = bigquery.QueryJobConfig(query_parameters=params) if params else None
+    rows = client.query(sql, job_config=job_config).result(page_size=page_size)
+    chunks = rows.to_arrow_iterable() if as_arrow else rows.to_dataframe_iterable()
+
+    used = 0
+    for chunk in chunks:
+        yield chunk
+        used += _chunk_nbytes(chunk)
+        if max_bytes is not None and used >= max_bytes:
+            break
+
@@ -0,0 +1,138 @@
+import sqlite3
+
+# Backends de consulta para utils/bq.py.
+# La "interfaz" es la parte de bigquery.Client que usamos:
+#   client.query(sql, job_config=None) -> job
+#   job.result(page_size=None)         -> filas con total_rows, to_dataframe(),
+#                                         to_dataframe_iterable(), to_arrow_iterable() e iteración
+# Cualquier objeto que cumpla eso sirve como cliente en run_bq/run_bq_params/run_bq_stream.
+# - bigquery.Client: el real (get_bq_client por defecto).
+# - SQLiteBqClient: base de datos local, acepta la misma SQL parametrizada (@param y `tablas`).
+# - LocalBqClient: devuelve siempre el mismo DataFrame, para probar el paginado.
+
+def _params_dict(job_config) -> dict:
+    params = getattr(job_config, "query_parameters", None) or []
+    out = {}
+    for p in params:
+        if not hasattr(p, "value"):
+            raise TypeError(f"Parámetro no soportado en local: {type(p).__name__}")
+        out[p.name] = p.value
+    return out
+
+def _arrow_batches(pages):
+    import pyarrow as pa
+    for page in pages:
+        yield from pa.Table.from_pandas(page, preserve_index=False).to_batches()
+
+
+# --- CLIENTE LOCAL CON UN DATAFRAME FIJO ---
+
+class _LocalRowIterator:
+    def __init__(self, df, page_size: int | None):
+        self._df = df
+        self.page_size = page_size or max(len(df), 1)
+        self.total_rows = len(df)
+
+    def __iter__(self):
+        return self._df.itertuples(index=False)
+
+    def to_dataframe(self):
+        return self._df.copy()
+
+    def to_dataframe_iterable(self):
+        for start in range(0, self.total_rows, self.page_size):
+            yield self._df.iloc[start:start + self.page_size].reset_index(drop=True)
+
+    def to_arrow_iterable(self):
+        return _arrow_batches(self.to_dataframe_iterable())
+
+class _LocalJob:
+    def __init__(self, df):
+        self._df = df
+
+    def result(self, page_size: int | None = None):
+        return _LocalRowIterator(self._df, page_size)
+
+class LocalBqClient:
+    """Cliente de pruebas: cualquier query devuelve `df`. Permite probar el paginado offline."""
+    def __init__(self, df):
+        self.df = df
+        self.queries = []  # historial (sql, job_config) para poder inspeccionarlo
+
+    def query(self, sql: str, job_config=None):
+        self.queries.append((sql, job_config))
+        return _LocalJob(self.df)
+
+
+# --- CLIENTE SQLITE ---
+# SQLite entiende tal cual los parámetros con nombre `@email` y los identificadores entre backticks,
+# así que una tabla local llamada "proyecto.dataset.tabla" responde a la misma SQL que BigQuery.
+# Se abre una conexión por query: así se puede usar desde varios hilos a la vez.
+
+class _SQLiteRowIterator:
+    def __init__(self, path: str, sql: str, params: dict, page_size: int | None):
+        self._path = path
+        self._sql = sql
+        self._params = params
+        self.page_size = page_size or 10_000
+        self._total_rows = None
+
+    @property
+    def total_rows(self) -> int:
+        if self._total_rows is None:
+            with sqlite3.connect(self._path) as conn:
+                sql = self._sql.strip().rstrip(";")
+                # En sus propias líneas: un comentario '--' al final no se come el paréntesis
+                self._total_rows = conn.execute("SELECT COUNT(*) FROM (\n" + sql + "\n)", self._params).fetchone()[0]
+        return self._total_rows
+
+    def _pages(self):
+        conn = sqlite3.connect(self._path)
+        try:
+            cur = conn.execute(self._sql, self._params)
+            columns = [c[0] for c in cur.description or []]
+            while rows := cur.fetchmany(self.page_size):
+                yield columns, rows
+        finally:
+            conn.close()
+
+    def __iter__(self):
+        for _, rows in self._pages():
+            yield from rows
+
+    def to_dataframe_iterable(self):
+        import pandas as pd
+        for columns, rows in self._pages():
+            yield pd.DataFrame.from_records(rows, columns=columns)
+
+    def to_dataframe(self):
+        import pandas as pd
+        with sqlite3.connect(self._path) as conn:
+            return pd.read_sql_query(self._sql, conn, params=self._params)
+
+    def to_arrow_iterable(self):
+        return _arrow_batches(self.to_dataframe_iterable())
+
+class _SQLiteJob:
+    def __init__(self, path: str, sql: str, params: dict):
+        self._path = path
+        self._sql = sql
+        self._params = params
+
+    def result(self, page_size: int | None = None, timeout: float | None = None):
+        return _SQLiteRowIterator(self._path, self._sql, self._params, page_size)
+
+class SQLiteBqClient:
+    """Backend local sobre SQLite. Útil para medir cache, paginado y concurrencia sin GCP."""
+    project = "local"
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def query(self, sql: str, job_config=None):
+        return _SQLiteJob(self.path, sql, _params_dict(job_config))
+
+    def load_table(self, table: str, df, if_exists: str = "replace"):
+        """Carga un DataFrame como tabla (p. ej. table='proyecto.dataset.allowed_users')."""
+        with sqlite3.connect(self.path) as conn:
+            df.to_sql(table, conn, if_exists=if_exists, index=False)
@@ -0,0 +1,191 @@
+import importlib
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+from utils.jobs import get_job_manager
+
+try:
+    import pyarrow as pa  # columnas de texto/objetos como Arrow IPC (si no, pickle)
+except ImportError:
+    pa = None
+
+# Cálculos pesados (pandas/NumPy) fuera del hilo del script.
+# Un cálculo CPU en el hilo de Streamlit retiene el GIL y ralentiza los reruns de todas las sesiones.
+# Aquí se ejecuta en el pool de procesos del JobManager (utils/jobs.py):
+# - Solo funciones registradas con @compute_function y definidas en un módulo (el proceso hijo las importa).
+# - Los arrays y las columnas de los DataFrames viajan en bloques de multiprocessing.shared_memory:
+#   el hijo los usa sin copiar y no se serializan con pickle. Lo mismo con el resultado de vuelta
+#   (el padre lo copia una vez y libera el bloque).
+# - Columnas de texto/objetos: Arrow IPC en memoria compartida si hay pyarrow; si no, pickle.
+# Uso:
+#   df = run_compute("expensive", 20000, 3)          # espera el resultado (sin retener el GIL)
+#   fut = submit_compute("expensive", 20000, 3)      # Future
+
+_REGISTRY = {}  # nombre -> (módulo, qualname)
+
+def compute_function(fn=None, *, name: str | None = None):
+    """Registra fn para run_compute/submit_compute. Devuelve fn sin cambios (así se puede pickear)."""
+    def register(fn):
+        if fn.__module__ == "__main__" or "<locals>" in fn.__qualname__:
+            raise ValueError(f"{fn.__qualname__}: debe estar definida a nivel de módulo importable")
+        _REGISTRY[name or fn.__name__] = (fn.__module__, fn.__qualname__)
+        return fn
+    return register(fn) if fn is not None else register
+
+def registered() -> list:
+    return sorted(_REGISTRY)
+
+
+# --- Codificación en memoria compartida ---
+
+def _new_block(nbytes: int, blocks: list) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+    blocks.append(shm)
+    return shm
+
+def _encode_array(arr: np.ndarray, blocks: list):
+    if arr.dtype.hasobject:
+        return _encode_objects(arr, blocks)
+    arr = np.ascontiguousarray(arr)
+    shm = _new_block(arr.nbytes, blocks)
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    return ("nd", shm.name, arr.shape, arr.dtype.str)
+
+def _encode_objects(values, blocks: list):
+    if pa is None or np.ndim(values) != 1:
+        return ("py", values)
+    try:
+        table = pa.table({"v": pa.array(values, from_pandas=True)})
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return ("py", values)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    data = sink.getvalue()
+    shm = _new_block(data.size, blocks)
+    shm.buf[:data.size] = memoryview(data)
+    return ("arrow", shm.name, data.size)
+
+def _encode_index(index: pd.Index, blocks: list):
+    if isinstance(index, pd.RangeIndex):
+        return ("range", index.start, index.stop, index.step, index.name)
+    return ("index", _encode_array(index.to_numpy(), blocks), index.name)
+
+def _encode(value, blocks: list):
+    if isinstance(value, pd.DataFrame):
+        cols = [(c, _encode_column(value[c], blocks)) for c in value.columns]
+        return ("df", cols, _encode_index(value.index, blocks))
+    if isinstance(value, pd.Series):
+        return ("series", value.name, _encode_column(value, blocks), _encode_index(value.index, blocks))
+    if isinstance(value, np.ndarray):
+        return _encode_array(value, blocks)
+    return ("py", value)
+
+def _encode_column(series: pd.Series, blocks: list):
+    if isinstance(series.dtype, np.dtype):
+        return _encode_array(series.to_numpy(), blocks)
+    return ("py", series.array)  # tipos de extensión (categorías, nullable...): pickle
+
+def _attach(name: str, attached: list) -> shared_memory.SharedMemory:
+    shm = shared_memory.SharedMemory(name=name)
+    attached.append(shm)
+    return shm
+
+def _decode(desc, attached: list, copy: bool):
+    """copy=False: vistas sobre los bloques (el bloque debe seguir abierto mientras se usen)."""
+    kind = desc[0]
+    if kind == "py":
+        return desc[1]
+    if kind == "nd":
+        _, name, shape, dtype = desc
+        arr = np.ndarray(shape, dtype=np.dtype(dtype), buffer=_attach(name, attached).buf)
+        return arr.copy() if copy else arr
+    if kind == "arrow":
+        _, name, size = desc
+        buf = _attach(name, attached).buf[:size]
+        values = pa.ipc.open_stream(pa.py_buffer(buf)).read_all().column("v").to_pandas().to_numpy()
+        buf.release()
+        return values
+    if kind == "df":
+        _, cols, index = desc
+        data = {c: _decode(d, attached, copy) for c, d in cols}
+        return pd.DataFrame(data, index=_decode_index(index, attached, copy), columns=[c for c, _ in cols], copy=False)
+    if kind == "series":
+        _, name, values, index = desc
+        return pd.Series(_decode(values, attached, copy), index=_decode_index(index, attached, copy), name=name, copy=False)
+    raise ValueError(f"descriptor desconocido: {kind}")
+
+def _decode_index(desc, attached: list, copy: bool) -> pd.Index:
+    if desc[0] == "range":
+        _, start, stop, step, name = desc
+        return pd.RangeIndex(start, stop, step, name=name)
+    return pd.Index(_decode(desc[1], attached, copy), name=desc[2])
+
+def _close(blocks: list, unlink: bool):
+    for shm in blocks:
+        try:
+            shm.close()
+        except BufferError:
+            pass  # aún hay vistas vivas: el mapeo se libera cuando desaparezcan
+        if unlink:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+# --- Ejecución ---
+
+def _call(module: str, qualname: str, args_desc, kwargs_desc):
+    """Se ejecuta en el proceso hijo: vistas de la entrada -> función -> resultado en bloques nuevos."""
+    fn = importlib.import_module(module)
+    for part in qualname.split("."):
+        fn = getattr(fn, part)
+    attached, out_blocks = [], []
+    try:
+        args = [_decode(d, attached, copy=False) for d in args_desc]
+        kwargs = {k: _decode(d, attached, copy=False) for k, d in kwargs_desc.items()}
+        result = _encode(fn(*args, **kwargs), out_blocks)
+        del args, kwargs
+        return result
+    except BaseException:
+        _close(out_blocks, unlink=True)
+        raise
+    finally:
+        _close(attached, unlink=False)
+        _close(out_blocks, unlink=False)  # los libera el padre (unlink) al leer el resultado
+
+def submit_compute(name: str, *args, **kwargs) -> Future:
+    module, qualname = _REGISTRY[name]
+    in_blocks = []
+    try:
+        args_desc = [_encode(a, in_blocks) for a in args]
+        kwargs_desc = {k: _encode(v, in_blocks) for k, v in kwargs.items()}
+        fut = get_job_manager().processes.submit(_call, module, qualname, args_desc, kwargs_desc)
+    except BaseException:
+        _close(in_blocks, unlink=True)
+        raise
+    out = Future()
+
+    def done(f):
+        _close(in_blocks, unlink=True)
+        if f.cancelled():
+            out.cancel()
+            return
+        if f.exception() is not None:
+            out.set_exception(f.exception())
+            return
+        attached = []
+        try:
+            out.set_result(_decode(f.result(), attached, copy=True))
+        except BaseException as e:
+            out.set_exception(e)
+        finally:
+            _close(attached, unlink=True)
+
+    fut.add_done_callback(done)
+    return out
+
+def run_compute(name: str, *args, timeout: float | None = None, **kwargs):
+    return submit_compute(name, *args, **kwargs).result(timeout)
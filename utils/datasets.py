@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Proveedor de datasets de ejemplo compartidos.
+# Antes cada página hacía np.random.seed(0) y regeneraba sus DataFrames en cada rerun:
+# - trabajo repetido en cada interacción,
+# - y reseed del RNG global de NumPy, que es estado de TODO el proceso (interfiere entre sesiones).
+# Aquí cada dataset se declara una vez con su propio np.random.Generator (semilla fija),
+# se construye una sola vez por proceso (cache_resource) y todas las páginas/sesiones lo comparten.
+# Los datos son compartidos y de solo lectura: los arrays (también las columnas de los DataFrames) se
+# marcan write=False y get_dataset devuelve una copia superficial del DataFrame (sin copiar datos), así
+# que añadir/reemplazar columnas o escribir celdas en una página no altera lo que ven las demás sesiones.
+
+_BUILDERS = {}  # nombre -> (builder(rng), versión, semilla)
+
+def dataset(name: str, version: int = 1, seed: int = 0):
+    """Decorador para registrar un dataset. Cambiar `version` fuerza a reconstruirlo (y sus índices)."""
+    def register(builder):
+        _BUILDERS[name] = (builder, version, seed)
+        return builder
+    return register
+
+def dataset_version(name: str) -> int:
+    return _BUILDERS[name][1]
+
+def get_dataset(name: str):
+    data = _build(name, dataset_version(name))
+    if isinstance(data, pd.DataFrame):
+        return data.copy(deep=False)  # columnas propias de quien llama sobre los mismos arrays
+    return data
+
+def _freeze(df: pd.DataFrame) -> pd.DataFrame:
+    """DataFrame sobre arrays de solo lectura (una columna por array, sin consolidar en bloques)."""
+    columns = {}
+    for col in df.columns:
+        if not isinstance(df[col].dtype, np.dtype):
+            columns[col] = df[col]  # tipos de extensión (texto, categorías...): se dejan como están
+            continue
+        values = df[col].to_numpy(copy=True)
+        values.setflags(write=False)
+        columns[col] = values
+    return pd.DataFrame(columns, index=df.index, columns=df.columns, copy=False)
+
+@st.cache_resource
+def _build(name: str, version: int):
+    builder, _, seed = _BUILDERS[name]
+    data = builder(np.random.default_rng(seed))
+    if isinstance(data, np.ndarray):
+        data.setflags(write=False)  # evita modificar por error el array compartido
+    elif isinstance(data, pd.DataFrame):
+        data = _freeze(data)
+    return data
+
+
+# --- DATASETS DE LA APP ---
+
+def _scores(rng, size: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "group": rng.choice(["A", "B", "C"], size=size),
+        "score": rng.integers(0, 101, size=size),
+    })
+
+@dataset("scores_200")
+def _scores_200(rng):
+    return _scores(rng, 200)
+
+@dataset("scores_300")
+def _scores_300(rng):
+    return _scores(rng, 300)
+
+@dataset("randn_xy")
+def _randn_xy(rng):
+    return pd.DataFrame(rng.standard_normal((20, 2)), columns=["x", "y"])
+
+@dataset("randn_wide")
+def _randn_wide(rng):
+    return pd.DataFrame(rng.standard_normal((10, 20)), columns=[f"col {i}" for i in range(20)])
+
+@dataset("randn_abc")
+def _randn_abc(rng):
+    return pd.DataFrame(rng.standard_normal((20, 3)), columns=["a", "b", "c"])
+
+@dataset("sf_points")
+def _sf_points(rng):
+    return pd.DataFrame(rng.standard_normal((1000, 2)) / [50, 50] + [37.76, -122.4], columns=["lat", "lon"])
+
+@dataset("sine_noise")
+def _sine_noise(rng):
+    df = pd.DataFrame({
+        "x": np.linspace(0, 10, 120),
+        "y": np.sin(np.linspace(0, 5 * np.pi, 120)) + rng.normal(0, 0.15, 120),
+    })
+    df["z"] = (df["y"] - df["y"].min()) / (df["y"].max() - df["y"].min())
+    return df
+
+@dataset("random_image")
+def _random_image(rng):
+    return (rng.random((120, 160, 3)) * 255).astype(np.uint8)
+
+@dataset("products")
+def _products(rng):
+    return pd.DataFrame({
+        "id": np.arange(10_000),
+        "name": [f"Producto {i}" for i in range(10_000)],
+        "price": np.round(rng.random(10_000) * 100, 2),
+    })
@@ -0,0 +1,254 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# st.data_editor guardando solo los cambios.
+# Antes: st.data_editor(df.copy()) -> una copia de toda la tabla por rerun y sesión, y el valor devuelto
+# es otra copia completa. Memoria y tiempo crecían con el tamaño de la tabla, no con lo editado.
+# Aquí:
+# - Cada tabla se registra una vez por proceso (EditableTable): la base es inmutable y compartida.
+# - Lo que se edita se lee del estado del widget (edited_rows / added_rows / deleted_rows): un Delta
+#   con solo las filas tocadas. La validación de column_config (required, min/max, options, max_chars,
+#   validate) se hace de forma vectorizada sobre esas filas, no sobre la tabla.
+# - commit() añade el Delta al registro de cambios (un lote por commit) y, si hay EDITOR_STORE_DB,
+#   lo guarda en SQLite. La vista "base + cambios" se materializa una vez por versión, compartida
+#   por todas las sesiones.
+# Uso:
+#   delta = delta_editor("comandos", df_base, column_config=..., num_rows="dynamic")
+#   if st.button("Guardar", disabled=delta.empty or bool(delta.errors)):
+#       delta.commit(); st.rerun()
+# Se sigue pagando la copia que st.data_editor hace internamente para su valor de retorno.
+
+EDITOR_STORE_DB = os.environ.get("EDITOR_STORE_DB")  # None = solo memoria
+EDITOR_KEEP_VIEWS = 4  # versiones materializadas que se guardan (sesiones con cambios sin guardar)
+
+def _coerce(dtype, value):
+    """Valor que devuelve el editor (JSON) -> tipo de la columna."""
+    if value is None:
+        return None
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        ts = pd.Timestamp(value)
+        tz = getattr(dtype, "tz", None)
+        if tz is not None:
+            return ts.tz_localize(tz) if ts.tz is None else ts.tz_convert(tz)
+        return ts.tz_convert(None) if ts.tz is not None else ts
+    return value
+
+def _label(value):
+    """Etiquetas de NumPy -> tipos de Python (para guardarlas en JSON)."""
+    return value.item() if isinstance(value, np.generic) else value
+
+def _set(frame: pd.DataFrame, label, col, value):
+    try:
+        frame.at[label, col] = value
+    except (TypeError, ValueError):  # p. ej. None en una columna de enteros
+        frame[col] = frame[col].astype(object)
+        frame.at[label, col] = value
+
+class Delta:
+    """Cambios respecto a una versión de la tabla, por etiqueta de fila (índice)."""
+    def __init__(self, edited: dict | None = None, added: list | None = None, deleted: list | None = None):
+        self.edited = edited or {}    # etiqueta -> {columna: valor}
+        self.added = added or []      # [{columna: valor}]
+        self.deleted = deleted or []  # [etiqueta]
+        self.errors = []
+        self.table = None
+        self.version = None
+
+    @classmethod
+    def from_editor(cls, state: dict, view: pd.DataFrame) -> "Delta":
+        """state: st.session_state[key] del data_editor (posiciones de fila de la vista)."""
+        labels = view.index
+        edited = {_label(labels[int(pos)]): dict(changes) for pos, changes in state.get("edited_rows", {}).items()}
+        deleted = [_label(labels[int(pos)]) for pos in state.get("deleted_rows", [])]
+        added = [dict(row) for row in state.get("added_rows", [])]
+        return cls(edited, added, deleted)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.edited or self.added or self.deleted)
+
+    def summary(self) -> dict:
+        return {"edited": len(self.edited), "added": len(self.added), "deleted": len(self.deleted)}
+
+    def rows(self, view: pd.DataFrame) -> pd.DataFrame:
+        """Solo las filas editadas (con los cambios aplicados) y las añadidas."""
+        deleted = set(self.deleted)
+        labels = [label for label in self.edited if label not in deleted]
+        rows = view.loc[labels].astype(object)  # solo las filas tocadas; object admite cualquier valor editado
+        for label in labels:
+            for col, value in self.edited[label].items():
+                if col in rows.columns:
+                    rows.at[label, col] = _coerce(view[col].dtype, value)
+        if self.added:
+            added = pd.DataFrame([{k: v for k, v in r.items() if k != "_index"} for r in self.added],
+                                 columns=view.columns, dtype=object)
+            rows = pd.concat([rows, added], ignore_index=True)
+        return rows
+
+    def commit(self):
+        if self.table is None:
+            raise RuntimeError("Delta sin tabla: usar el que devuelve delta_editor()")
+        version = self.table.commit(self)
+        st.session_state[_pin_key(self.table.name)] = version
+        return version
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "edited": [[label, changes] for label, changes in self.edited.items()],
+            "added": self.added, "deleted": self.deleted,
+        }, default=str)
+
+    @classmethod
+    def from_json(cls, data: str) -> "Delta":
+        d = json.loads(data)
+        return cls({label: changes for label, changes in d["edited"]}, d["added"], d["deleted"])
+
+
+def validate(rows: pd.DataFrame, column_config: dict | None) -> list:
+    """Reglas de column_config aplicadas columna a columna (vectorizado) sobre las filas cambiadas."""
+    errors = []
+    for col, config in (column_config or {}).items():
+        if col not in rows.columns or not isinstance(config, dict):
+            continue
+        values = rows[col]
+        rules = config.get("type_config") or {}
+        bad = pd.Series(False, index=rows.index)
+        if config.get("required"):
+            bad |= values.isna()
+        if "min_value" in rules or "max_value" in rules:
+            numbers = pd.to_numeric(values, errors="coerce")
+            if rules.get("min_value") is not None:
+                bad |= numbers < rules["min_value"]
+            if rules.get("max_value") is not None:
+                bad |= numbers > rules["max_value"]
+        if rules.get("options") is not None:
+            bad |= values.notna() & ~values.isin(rules["options"])
+        if rules.get("max_chars") is not None:
+            bad |= values.astype("string").str.len().fillna(0) > rules["max_chars"]
+        if rules.get("validate"):
+            bad |= values.notna() & ~values.astype("string").str.fullmatch(rules["validate"]).fillna(False)
+        if bad.any():
+            label = config.get("label") or col
+            errors.append(f"{label}: {int(bad.sum())} valor(es) no válido(s)")
+    return errors
+
+
+class EditableTable:
+    def __init__(self, name: str, base: pd.DataFrame, db_path: str | None = EDITOR_STORE_DB):
+        self.name = name
+        self.base = base
+        self.db_path = db_path
+        self.version = 0
+        self.log = []  # [(versión, momento, resumen)] un lote por commit
+        self._views = OrderedDict({0: base})  # versión -> tabla materializada (la 0 es la base, sin copia)
+        self._lock = threading.Lock()
+        if db_path:
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS editor_changes (table_name TEXT, version INTEGER, at REAL, delta TEXT, PRIMARY KEY (table_name, version))")
+                rows = conn.execute("SELECT version, at, delta FROM editor_changes WHERE table_name = ? ORDER BY version", (name,)).fetchall()
+            for version, at, data in rows:
+                self._apply(Delta.from_json(data), at, persist=False)
+
+    def view(self, version: int | None = None) -> pd.DataFrame | None:
+        """Tabla en esa versión (None si ya no se guarda). Compartida: no modificar."""
+        with self._lock:
+            return self._views.get(self.version if version is None else version)
+
+    def commit(self, delta: Delta) -> int:
+        """Aplica un lote de cambios sobre la versión actual (por etiqueta de fila). Devuelve la versión nueva."""
+        with self._lock:
+            return self._apply(delta, time.time(), persist=True)
+
+    def _apply(self, delta: Delta, at: float, persist: bool) -> int:
+        current = self._views[self.version]
+        deleted = [label for label in delta.deleted if label in current.index]
+        out = current.drop(index=deleted) if deleted else current.copy()
+        for label, changes in delta.edited.items():
+            if label in out.index:
+                for col, value in changes.items():
+                    if col in out.columns:
+                        _set(out, label, col, _coerce(out[col].dtype, value))
+        if delta.added:
+            rows = pd.DataFrame([{k: v for k, v in r.items() if k != "_index"} for r in delta.added],
+                                columns=out.columns, index=self._new_labels(current, delta.added))
+            for col in rows.columns:
+                rows[col] = [_coerce(out[col].dtype, v) for v in rows[col]]
+            out = pd.concat([out, rows])
+        self.version += 1
+        self._views[self.version] = out
+        while len(self._views) > EDITOR_KEEP_VIEWS:
+            self._views.popitem(last=False)
+        self.log.append((self.version, at, delta.summary()))
+        if persist and self.db_path:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("INSERT INTO editor_changes (table_name, version, at, delta) VALUES (?, ?, ?, ?)",
+                             (self.name, self.version, at, delta.to_json()))
+        return self.version
+
+    def _new_labels(self, current: pd.DataFrame, added: list) -> list:
+        given = [row.get("_index") for row in added]
+        if all(label is not None for label in given):
+            return given
+        if pd.api.types.is_integer_dtype(current.index) and len(current.index):
+            start = int(current.index.max()) + 1
+        else:
+            start = len(current.index)
+        return list(range(start, start + len(added)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.version, "rows": len(self._views[self.version]), "commits": len(self.log),
+                "views_kept": list(self._views), "last": self.log[-1][2] if self.log else None,
+            }
+
+class EditorStore:
+    def __init__(self):
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def table(self, name: str, base: pd.DataFrame) -> EditableTable:
+        """Registra la tabla la primera vez; después se ignora `base` (la tabla compartida ya existe)."""
+        with self._lock:
+            if name not in self._tables:
+                self._tables[name] = EditableTable(name, base)
+            return self._tables[name]
+
+@st.cache_resource
+def get_editor_store() -> EditorStore:
+    return EditorStore()
+
+def _pin_key(name: str) -> str:
+    return f"_delta_editor_{name}"
+
+def delta_editor(name: str, base: pd.DataFrame, column_config: dict | None = None, **kwargs) -> Delta:
+    """
+    Sustituto de st.data_editor para DataFrames. Devuelve el Delta pendiente (con .errors) en vez de
+    una copia editada de la tabla. Los demás argumentos se pasan a st.data_editor (sin key: usa name).
+    """
+    table = get_editor_store().table(name, base)
+    ss = st.session_state
+    pinned = ss.get(_pin_key(name), table.version)
+    view = table.view(pinned)
+    widget_key = f"{name}@v{pinned}"
+    pending = ss.get(widget_key) or {}
+    # Sin cambios pendientes (o su versión ya no se guarda) -> pasa a la última versión de la tabla
+    if view is None or (pinned != table.version and Delta.from_editor(pending, view).empty):
+        pinned, view = table.version, table.view()
+        widget_key = f"{name}@v{pinned}"
+    ss[_pin_key(name)] = pinned
+
+    st.data_editor(view, column_config=column_config, key=widget_key, **kwargs)
+
+    delta = Delta.from_editor(ss.get(widget_key) or {}, view)
+    delta.table, delta.version = table, pinned
+    if not delta.empty:
+        delta.errors = validate(delta.rows(view), column_config)
+    return delta
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import threading
+import time
+
+try:
+    import pyarrow as pa  # pip install pyarrow (ya viene con google-cloud-bigquery[pandas])
+except ImportError:
+    pa = None
+
+# Segundo nivel de cache: resultados guardados en disco como ficheros Arrow IPC.
+# - Cada fichero se nombra con el sha256 de la clave (direccionado por contenido).
+# - Se lee con memory map: el sistema operativo pagina el fichero, no hay copia al leer la tabla Arrow.
+# - Sobrevive a reinicios/deploys, así que el primer usuario tras reiniciar no paga BigQuery.
+# Sin pyarrow instalado el cache queda desactivado (get devuelve None y put no hace nada).
+# Si un resultado no se puede escribir (Arrow no lo convierte, disco lleno...) put lo omite y cuenta `errors`.
+
+DISK_CACHE_DIR = ".cache/results"
+DISK_CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+DISK_CACHE_MAX_AGE = 24 * 3600  # segundos
+
+def fingerprint(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+class DiskCache:
+    def __init__(self, directory: str = DISK_CACHE_DIR, max_bytes: int = DISK_CACHE_MAX_BYTES,
+                 max_age: float = DISK_CACHE_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.enabled = pa is not None
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.writes = self.evictions = self.errors = 0
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, fingerprint(key) + ".arrow")
+
+    def get_table(self, key: str, max_age: float | None = None):
+        """Devuelve la pyarrow.Table (memory-mapped, sin copia) o None si no existe o es más vieja que max_age."""
+        if not self.enabled:
+            return None
+        path = self.path(key)
+        max_age = self.max_age if max_age is None else max_age
+        try:
+            if time.time() - os.path.getmtime(path) > max_age:
+                self.misses += 1
+                return None
+            with pa.memory_map(path, "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+        except (FileNotFoundError, pa.ArrowInvalid):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return table
+
+    def get(self, key: str, max_age: float | None = None):
+        """Como get_table pero convierte a DataFrame."""
+        table = self.get_table(key, max_age)
+        return None if table is None else table.to_pandas()
+
+    def put(self, key: str, value) -> bool:
+        """
+        Guarda un DataFrame (o pyarrow.Table). Escribe en un temporal y renombra: nunca se lee un fichero a medias.
+        Si no se puede (tipos que Arrow no convierte, disco lleno, permisos...) no guarda nada y devuelve False:
+        el disco es solo un segundo nivel y nunca debe hacer fallar a quien llama.
+        """
+        if not self.enabled:
+            return False
+        path = self.path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            table = value if isinstance(value, pa.Table) else pa.Table.from_pandas(value, preserve_index=False)
+            with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, path)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, OSError):
+            self.errors += 1
+            return False
+        finally:
+            try:
+                os.remove(tmp)  # solo queda si la escritura falló a medias
+            except FileNotFoundError:
+                pass
+        self.writes += 1
+        self.evict()
+        return True
+
+    def invalidate(self, key: str | None = None):
+        """Borra un fichero, o todos si key es None."""
+        if not self.enabled:
+            return
+        paths = [self.path(key)] if key is not None else [f.path for f in os.scandir(self.directory)]
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """Borra ficheros más viejos que max_age y, si aún se pasa de max_bytes, los más antiguos primero."""
+        with self._lock:
+            now = time.time()
+            files = []
+            for f in os.scandir(self.directory):
+                if f.name.endswith(".tmp"):  # escritura en curso
+                    continue
+                try:
+                    st_ = f.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((st_.st_mtime, st_.st_size, f.path))
+            files.sort()  # más antiguos primero
+            total = sum(size for _, size, _ in files)
+            for mtime, size, path in files:
+                if now - mtime <= self.max_age and total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        files = [f.stat().st_size for f in os.scandir(self.directory)] if self.enabled else []
+        return {
+            "enabled": self.enabled, "files": len(files), "bytes": sum(files), "max_bytes": self.max_bytes,
+            "hits": self.hits, "misses": self.misses, "writes": self.writes, "evictions": self.evictions,
+            "errors": self.errors,
+        }
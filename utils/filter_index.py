@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Índice para el filtro global (group == g) & (score >= t).
+# En vez de recorrer todo el DataFrame con una máscara en cada movimiento del slider:
+# - Se ordenan las filas por (group, score) una sola vez.
+# - Cada grupo ocupa un tramo [inicio, fin) del orden, con sus scores ya ordenados.
+# - Una consulta es una búsqueda binaria en el tramo del grupo + un slice.
+# El índice se cachea con cache_resource por (dataset, versión): se reconstruye solo si cambia la versión.
+
+class GroupScoreIndex:
+    def __init__(self, df, group_col: str = "group", score_col: str = "score"):
+        codes, groups = pd.factorize(df[group_col])  # grupos -> enteros (ordenar enteros es más rápido que strings)
+        scores = df[score_col].to_numpy()
+        self._order = np.lexsort((scores, codes))  # posiciones de fila ordenadas por grupo y luego score
+        self._scores = scores[self._order]
+        sorted_codes = codes[self._order]
+        present, starts = np.unique(sorted_codes, return_index=True)
+        ends = np.append(starts[1:], len(sorted_codes))
+        self._ranges = {groups[c]: (int(s), int(e)) for c, s, e in zip(present, starts, ends) if c >= 0}  # -1 = NaN
+
+    def positions(self, group, threshold, limit: int | None = None) -> np.ndarray:
+        """
+        Posiciones (iloc) de las filas del grupo con score >= threshold, en el orden original.
+        Con limit solo las `limit` primeras: partition (lineal) y se ordenan solo esas, no todo el tramo.
+        """
+        start, end = self._ranges.get(group, (0, 0))
+        first = start + int(np.searchsorted(self._scores[start:end], threshold, side="left"))
+        pos = self._order[first:end]
+        if limit is not None and limit < len(pos):
+            if limit <= 0:
+                return pos[:0]
+            pos = np.partition(pos, limit - 1)[:limit]
+        return np.sort(pos)
+
+    def count(self, group, threshold) -> int:
+        start, end = self._ranges.get(group, (0, 0))
+        return end - start - int(np.searchsorted(self._scores[start:end], threshold, side="left"))
+
+    def filter(self, df, group, threshold, limit: int | None = None):
+        """Equivale a df[(df.group == group) & (df.score >= threshold)].head(limit)."""
+        return df.iloc[self.positions(group, threshold, limit)]
+
+@st.cache_resource(max_entries=32)
+def get_group_score_index(dataset: str, version, _df) -> GroupScoreIndex:
+    """_df no se hashea (empieza por _): la clave de cache es (dataset, version)."""
+    return GroupScoreIndex(_df)
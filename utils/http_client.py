@@ -0,0 +1,267 @@
+import asyncio
+import email.utils
+import hashlib
+import http.client
+import json
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from urllib.parse import urlencode, urlsplit
+from utils.singleflight import SingleFlight
+
+# Cliente HTTP con solo la librería estándar:
+# - Pool de conexiones keep-alive acotado (como mucho HTTP_POOL_SIZE a la vez por cliente).
+# - Reintentos con backoff exponencial y jitter para errores de red y 429/5xx (solo métodos idempotentes).
+#   Aparte, si una conexión reutilizada ya la cerró el servidor (falla antes de recibir nada de la
+#   respuesta) la petición se repite una vez por una conexión nueva, sea cual sea el método.
+# - GETs idénticos simultáneos se agrupan (single-flight): una sola petición real.
+# - Cache de respuestas que respeta Cache-Control (max-age, no-cache, no-store) y revalida con
+#   ETag / Last-Modified (If-None-Match / If-Modified-Since -> 304).
+# - Interfaz síncrona (request, get_json) y asyncio (arequest, aget_json).
+# El cliente es compartido por todas las sesiones: cache y single-flight van por URL + cabeceras de la
+# petición (Authorization, Cookie...), así una respuesta autorizada de un usuario no le llega a otro.
+# No se guardan respuestas "private" ni con "Vary: *".
+# Para probarlo sin una API real: utils/local_api.py (LocalApiServer).
+
+HTTP_POOL_SIZE = 10
+HTTP_TIMEOUT = 10      # segundos por petición (y esperando conexión libre del pool)
+HTTP_RETRIES = 3
+HTTP_BACKOFF = 0.2     # segundos, base del backoff exponencial
+HTTP_BACKOFF_MAX = 5
+HTTP_CACHE_ENTRIES = 1000
+RETRY_STATUS = {429, 500, 502, 503, 504}
+IDEMPOTENT = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+@dataclass(frozen=True)
+class ApiResponse:
+    status: int
+    headers: dict  # claves en minúsculas
+    body: bytes
+    from_cache: bool = False
+
+    def json(self):
+        return json.loads(self.body)
+
+class ConnectionPool:
+    """Conexiones keep-alive a un host. Como mucho `size` en uso a la vez; las libres se reutilizan."""
+    def __init__(self, scheme: str, host: str, port: int | None, size: int = HTTP_POOL_SIZE,
+                 timeout: float = HTTP_TIMEOUT):
+        self._cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        self.host, self.port, self.timeout = host, port, timeout
+        self._idle = queue.LifoQueue()  # la más reciente primero: es la que menos probable esté cerrada
+        self._slots = threading.BoundedSemaphore(size)
+        self.created = self.reused = 0
+
+    def acquire(self, fresh: bool = False):
+        """Devuelve (conexión, reutilizada). fresh=True: siempre una conexión nueva."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError("No hay conexiones libres en el pool")
+        if not fresh:
+            try:
+                conn = self._idle.get_nowait()
+                self.reused += 1
+                return conn, True
+            except queue.Empty:
+                pass
+        self.created += 1
+        return self._cls(self.host, self.port, timeout=self.timeout), False
+
+    def release(self, conn, reuse: bool = True):
+        if reuse:
+            self._idle.put(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+def _freshness(headers: dict) -> float | None:
+    """Segundos que la respuesta se puede servir sin revalidar; None = no guardar."""
+    directives = {}
+    for part in headers.get("cache-control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    if "no-store" in directives or "private" in directives:  # private: no en un cache compartido
+        return None
+    if headers.get("vary", "").strip() == "*":
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    if "max-age" in directives:
+        try:
+            return max(float(directives["max-age"]), 0.0)
+        except ValueError:
+            return 0.0
+    if "expires" in headers:
+        try:
+            return max(email.utils.parsedate_to_datetime(headers["expires"]).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return 0.0
+    return 0.0
+
+class ResponseCache:
+    """clave (url + cabeceras) -> [respuesta, caduca_en]. Acotado por número de entradas (LRU)."""
+    def __init__(self, max_entries: int = HTTP_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, response: ApiResponse, ttl: float):
+        with self._lock:
+            self._entries[key] = [response, time.monotonic() + ttl]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+class HttpClient:
+    def __init__(self, base_url: str, pool_size: int = HTTP_POOL_SIZE, timeout: float = HTTP_TIMEOUT,
+                 retries: int = HTTP_RETRIES, backoff: float = HTTP_BACKOFF):
+        self.base_url = base_url.rstrip("/")
+        parts = urlsplit(self.base_url)
+        self._prefix = parts.path
+        self._pool = ConnectionPool(parts.scheme, parts.hostname, parts.port, pool_size, timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self._cache = ResponseCache()
+        self._flight = SingleFlight()
+        self.requests = self.retried = self.stale = self.cache_hits = self.revalidated = 0
+
+    # --- interfaz síncrona ---
+
+    def request(self, method: str, path: str, params: dict | None = None, body=None,
+                headers: dict | None = None) -> ApiResponse:
+        method = method.upper()
+        target = self._prefix + path + ("?" + urlencode(params, doseq=True) if params else "")
+        if method != "GET":
+            if isinstance(body, (dict, list)):
+                body = json.dumps(body).encode("utf-8")
+                headers = {"Content-Type": "application/json", **(headers or {})}
+            return self._send(method, target, body, headers or {})
+
+        headers = headers or {}
+        key = _request_key(target, headers)
+        entry = self._cache.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            self.cache_hits += 1
+            return _cached(entry[0])
+        return self._flight.do(key, lambda: self._get(key, target, headers))
+
+    def get_json(self, path: str, params: dict | None = None, headers: dict | None = None):
+        response = self.request("GET", path, params=params, headers=headers)
+        if response.status >= 400:
+            raise http.client.HTTPException(f"GET {path} -> {response.status}")
+        return response.json()
+
+    # --- interfaz asyncio (usa el mismo pool y cache desde un hilo) ---
+
+    async def arequest(self, method: str, path: str, params: dict | None = None, body=None,
+                       headers: dict | None = None) -> ApiResponse:
+        return await asyncio.to_thread(self.request, method, path, params, body, headers)
+
+    async def aget_json(self, path: str, params: dict | None = None, headers: dict | None = None):
+        return await asyncio.to_thread(self.get_json, path, params, headers)
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests, "retried": self.retried, "stale_connections": self.stale,
+            "cache_hits": self.cache_hits,
+            "revalidated": self.revalidated, "cache_entries": len(self._cache),
+            "connections_created": self._pool.created, "connections_reused": self._pool.reused,
+            "coalesced": self._flight.shared,
+        }
+
+    # --- internos ---
+
+    def _get(self, key: str, target: str, headers: dict) -> ApiResponse:
+        entry = self._cache.get(key)
+        if entry is not None:
+            cached = entry[0]
+            if "etag" in cached.headers:
+                headers = {"If-None-Match": cached.headers["etag"], **headers}
+            if "last-modified" in cached.headers:
+                headers = {"If-Modified-Since": cached.headers["last-modified"], **headers}
+        response = self._send("GET", target, None, headers)
+
+        if response.status == 304 and entry is not None:
+            self.revalidated += 1
+            ttl = _freshness(response.headers)
+            self._cache.set(key, entry[0], ttl or 0.0)
+            return _cached(entry[0])
+        if response.status == 200:
+            ttl = _freshness(response.headers)
+            has_validator = "etag" in response.headers or "last-modified" in response.headers
+            if ttl is not None and (ttl > 0 or has_validator):
+                self._cache.set(key, response, ttl)
+        return response
+
+    def _send(self, method: str, target: str, body, headers: dict) -> ApiResponse:
+        attempts = self.retries + 1 if method in IDEMPOTENT else 1
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                r, data = self._exchange(method, target, body, headers)
+            except (OSError, http.client.HTTPException):
+                if last:
+                    raise
+                self._sleep(attempt)
+                continue
+            self.requests += 1
+            response = ApiResponse(r.status, {k.lower(): v for k, v in r.getheaders()}, data)
+            if response.status not in RETRY_STATUS or last:
+                return response
+            self._sleep(attempt, response.headers.get("retry-after"))
+        raise AssertionError("inalcanzable")
+
+    def _exchange(self, method: str, target: str, body, headers: dict):
+        """
+        Una petición por una conexión del pool. Si la conexión era reutilizada y falla antes de que llegue
+        la respuesta (keep-alive que el servidor ya cerró: BrokenPipe, RemoteDisconnected...), se descarta
+        y se repite una vez por una conexión nueva, también para POST: es lo que pasaba sin pool.
+        """
+        conn, reused = self._pool.acquire()
+        while True:
+            responded = False
+            try:
+                conn.request(method, target, body=body, headers=headers)
+                r = conn.getresponse()
+                responded = True
+                data = r.read()
+            except (OSError, http.client.HTTPException) as e:
+                self._pool.release(conn, reuse=False)
+                if reused and not responded and isinstance(e, ConnectionError):
+                    self.stale += 1
+                    conn, reused = self._pool.acquire(fresh=True)
+                    continue
+                raise
+            self._pool.release(conn, reuse=not r.will_close)
+            return r, data
+
+    def _sleep(self, attempt: int, retry_after: str | None = None):
+        self.retried += 1
+        delay = random.uniform(0, min(HTTP_BACKOFF_MAX, self.backoff * 2 ** attempt))  # "full jitter"
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        time.sleep(delay)
+
+def _request_key(target: str, headers: dict) -> str:
+    """URL + cabeceras de la petición (hash: no se guardan credenciales en claro). Cubre cualquier Vary."""
+    if not headers:
+        return target
+    items = sorted((k.lower(), str(v)) for k, v in headers.items())
+    return target + "#" + hashlib.sha256(json.dumps(items).encode("utf-8")).hexdigest()
+
+def _cached(response: ApiResponse) -> ApiResponse:
+    return ApiResponse(response.status, response.headers, response.body, from_cache=True)
+
@@ -0,0 +1,192 @@
+import inspect
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Tareas en segundo plano que sobreviven a los reruns.
+# Antes: Thread propio + bucle is_alive()/sleep dentro del script -> el rerun queda bloqueado hasta que
+# acaba la tarea y, si el usuario toca algo, se pierde el trabajo.
+# Aquí:
+# - Un JobManager por proceso (cache_resource) con un pool de hilos acotado (IO) y otro de procesos (CPU).
+# - Cada tarea tiene un id; el script guarda solo el id en session_state y sigue su ejecución.
+# - El resultado se queda en el manager (fuera del script), así que un rerun no lo pierde.
+# - Progreso: si la función tiene un parámetro `job`, recibe el Job y puede llamar job.progress(...)
+#   y consultar job.cancelled para parar (cancelación cooperativa).
+# - watch_jobs() pinta el estado en un fragment que se refresca solo mientras haya tareas pendientes
+#   y hace un rerun de la app al terminar la última.
+# Las funciones del pool de procesos deben poder importarse (definidas en un módulo, no en la página).
+
+JOBS_MAX_THREADS = 4
+JOBS_MAX_PROCESSES = os.cpu_count() or 2
+JOBS_KEEP = 3600  # segundos que se guarda una tarea terminada
+JOBS_POLL = "0.5s"
+JOBS_MP_START = os.getenv("JOBS_MP_START", "spawn")  # fork desde un servidor con hilos no es seguro
+
+PENDING, RUNNING, DONE, ERROR, CANCELLED = "pending", "running", "done", "error", "cancelled"
+
+class Job:
+    def __init__(self, label: str, owner: str, kind: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.owner = owner
+        self.kind = kind
+        self.status = PENDING
+        self.fraction = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = self.finished = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    def progress(self, fraction: float, message: str = ""):
+        """Llamado desde la tarea (nunca st.* desde aquí)."""
+        self.fraction = min(max(float(fraction), 0.0), 1.0)
+        self.message = message
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def finished_ok(self) -> bool:
+        return self.status == DONE
+
+    @property
+    def pending(self) -> bool:
+        return self.status in (PENDING, RUNNING)
+
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+class JobManager:
+    def __init__(self, max_threads: int = JOBS_MAX_THREADS, max_processes: int = JOBS_MAX_PROCESSES):
+        self.threads = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="job")
+        self.max_processes = max_processes
+        self._processes = None
+        self._jobs = {}  # id -> Job
+        self._lock = threading.Lock()
+
+    @property
+    def processes(self) -> ProcessPoolExecutor:
+        # Se crea al primer uso: arrancar procesos cuesta y muchas páginas no los necesitan
+        with self._lock:
+            if self._processes is None:
+                ctx = multiprocessing.get_context(JOBS_MP_START)
+                self._processes = ProcessPoolExecutor(max_workers=self.max_processes, mp_context=ctx)
+            return self._processes
+
+    def submit(self, fn, *args, label: str | None = None, kind: str = "thread", owner: str | None = None, **kwargs) -> Job:
+        """kind='thread' para IO (admite progreso y cancelación), 'process' para CPU."""
+        job = Job(label or fn.__name__, owner or _session_id(), kind)
+        if kind == "thread":
+            if "job" in inspect.signature(fn).parameters:
+                kwargs["job"] = job
+            job.future = self.threads.submit(self._run, job, fn, args, kwargs)
+        elif kind == "process":
+            job.future = self.processes.submit(fn, *args, **kwargs)
+            job.status, job.started = RUNNING, time.time()  # no sabemos cuándo empieza en el otro proceso
+            job.future.add_done_callback(lambda fut: self._finish(job, fut))
+        else:
+            raise ValueError(f"kind desconocido: {kind}")
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        return job
+
+    def _run(self, job: Job, fn, args, kwargs):
+        if job.cancelled:
+            job.status = CANCELLED
+            return
+        job.status, job.started = RUNNING, time.time()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            job.error, job.status = e, ERROR
+        else:
+            job.result = result
+            job.status = CANCELLED if job.cancelled else DONE
+            if job.status == DONE:
+                job.fraction = 1.0
+        finally:
+            job.finished = time.time()
+
+    def _finish(self, job: Job, fut):
+        job.finished = time.time()
+        if fut.cancelled():
+            job.status = CANCELLED
+        elif fut.exception() is not None:
+            job.error, job.status = fut.exception(), ERROR
+        else:
+            job.result, job.status, job.fraction = fut.result(), DONE, 1.0
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, owner: str | None = None) -> list:
+        with self._lock:
+            return [j for j in self._jobs.values() if owner is None or j.owner == owner]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancela si aún no ha empezado; si está corriendo, lo marca y la tarea debe mirar job.cancelled."""
+        job = self.get(job_id)
+        if job is None or not job.pending:
+            return False
+        job._cancel.set()
+        if job.future.cancel():
+            job.status, job.finished = CANCELLED, time.time()
+        return True
+
+    def forget(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _prune(self):
+        limit = time.time() - JOBS_KEEP
+        for job_id in [i for i, j in self._jobs.items() if j.finished and j.finished < limit]:
+            del self._jobs[job_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {}
+        for j in jobs:
+            counts[j.status] = counts.get(j.status, 0) + 1
+        return {"jobs": len(jobs), **counts, "process_pool": self._processes is not None}
+
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    return JobManager()
+
+def _session_id() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "local"
+
+def watch_jobs(job_ids, render, interval: str = JOBS_POLL):
+    """
+    Pinta render(jobs) en un fragment. Mientras quede alguna tarea pendiente el fragment se refresca
+    cada `interval`; cuando termina la última hace un rerun de la app (y el fragment deja de refrescarse).
+    """
+    manager = get_job_manager()
+
+    def pending() -> bool:
+        return any(j.pending for j in (manager.get(i) for i in job_ids) if j)
+
+    was_pending = pending()
+
+    def body():
+        jobs = [j for j in (manager.get(i) for i in job_ids) if j]
+        render(jobs)
+        if was_pending and not pending():
+            st.rerun()  # aviso de fin: la página se vuelve a pintar ya sin refresco periódico
+
+    st.fragment(body, run_every=interval if was_pending else None)()
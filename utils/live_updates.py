@@ -0,0 +1,67 @@
+import time
+import pandas as pd
+
+# Actualizaciones en vivo (st.empty, st.progress, charts con add_rows) a un ritmo acotado.
+# Si el productor actualiza en cada iteración, cada llamada es un mensaje por websocket (y a veces
+# un DataFrame nuevo) para cada espectador. LiveUpdater guarda solo lo último de cada elemento,
+# acumula las filas nuevas de los gráficos y lo envía todo junto como mucho `fps` veces por segundo.
+# Uso:
+#   with LiveUpdater(fps=10) as live:
+#       for ...:
+#           live.progress(bar, i)
+#           live.add_rows(chart, {"y": v})
+#           live.render(placeholder, dibujar, i)   # dibujar() se llama dentro de placeholder.container()
+# Al salir del with se envía lo que quede pendiente.
+
+LIVE_FPS = 10
+
+class LiveUpdater:
+    def __init__(self, fps: float = LIVE_FPS):
+        self.interval = 1 / fps
+        self._last_flush = 0.0
+        self._progress = {}  # id(bar) -> (bar, valor, texto)
+        self._renders = {}   # id(placeholder) -> (placeholder, fn, args, kwargs)
+        self._rows = {}      # id(chart) -> (chart, [filas])
+        self.updates = self.flushes = self.messages = 0
+
+    def progress(self, bar, value, text: str | None = None):
+        self._progress[id(bar)] = (bar, value, text)
+        self._updated()
+
+    def render(self, placeholder, fn, *args, **kwargs):
+        """Redibuja el placeholder con fn(*args) en el próximo flush (solo la última llamada cuenta)."""
+        self._renders[id(placeholder)] = (placeholder, fn, args, kwargs)
+        self._updated()
+
+    def add_rows(self, chart, row: dict):
+        self._rows.setdefault(id(chart), (chart, []))[1].append(row)
+        self._updated()
+
+    def flush(self):
+        for bar, value, text in self._progress.values():
+            bar.progress(value, text=text)
+            self.messages += 1
+        for placeholder, fn, args, kwargs in self._renders.values():
+            with placeholder.container():
+                fn(*args, **kwargs)
+            self.messages += 1
+        for chart, rows in self._rows.values():
+            if rows:
+                chart.add_rows(pd.DataFrame(rows))  # un solo DataFrame por lote
+                self.messages += 1
+        self._progress.clear()
+        self._renders.clear()
+        self._rows.clear()
+        self._last_flush = time.monotonic()
+        self.flushes += 1
+
+    def _updated(self):
+        self.updates += 1
+        if time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
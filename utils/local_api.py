@@ -0,0 +1,85 @@
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# Servidor HTTP local para probar utils/http_client.py (no lo usa la app).
+# Sirve JSON en 127.0.0.1 con ETag y Cache-Control, y puede fallar a propósito, para probar
+# pool, reintentos y cache sin depender de una API real:
+#   with LocalApiServer({"/items": [...]}, max_age=30) as server:
+#       client = HttpClient(server.url)
+
+class LocalApiServer:
+    def __init__(self, routes: dict, max_age: int = 0, delay: float = 0.0):
+        self.routes = routes      # path -> objeto JSON
+        self.max_age = max_age
+        self.delay = delay        # latencia simulada por petición
+        self.hits = 0
+        self._fail = []           # códigos de estado a devolver en las próximas peticiones
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    def fail_next(self, n: int, status: int = 503):
+        with self._lock:
+            self._fail.extend([status] * n)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.hits += 1
+                    fail = server._fail.pop(0) if server._fail else None
+                if server.delay:
+                    time.sleep(server.delay)
+                if fail is not None:
+                    return self._reply(fail, b"{}")
+                path = urlsplit(self.path).path
+                if path not in server.routes:
+                    return self._reply(404, b"{}")
+                body = json.dumps(server.routes[path]).encode("utf-8")
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                headers = {"ETag": etag, "Cache-Control": f"max-age={server.max_age}"}
+                if self.headers.get("If-None-Match") == etag:
+                    return self._reply(304, b"", headers)
+                self._reply(200, body, headers)
+
+            def _reply(self, status: int, body: bytes, headers: dict | None = None):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
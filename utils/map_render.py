@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pydeck as pdk
+import streamlit as st
+
+# Pintar muchos puntos en un mapa sin bloquear el navegador.
+# - Color como entero RGBA empaquetado (uint32) calculado con una tabla por categoría:
+#   nada de construir un string '#rrggbbaa' por fila.
+# - Hasta max_points se envían los puntos tal cual (ScatterplotLayer de pydeck).
+# - Por encima se agregan en el servidor en una rejilla cuyo tamaño de celda depende del zoom
+#   (cell_px píxeles de pantalla): se envía un punto por celda y color, con radio según cuántos agrupa.
+# Streamlit no devuelve el viewport del mapa, así que zoom/bounds los pasa quien llama
+# (por defecto se calculan para encuadrar todos los datos).
+
+MAP_MAX_POINTS = 20_000
+MAP_CELL_PX = 12
+
+def pack_rgba(color: str, alpha: int = 255) -> int:
+    """'#rrggbb' + alpha (0-255) -> uint32 con bytes R, G, B, A en memoria (little-endian)."""
+    r, g, b = (int(color.lstrip("#")[i:i + 2], 16) for i in (0, 2, 4))
+    return r | g << 8 | b << 16 | alpha << 24
+
+def category_rgba(values, palette: dict) -> np.ndarray:
+    """Color por categoría sin bucles por fila. palette: categoría -> (color_hex, alpha)."""
+    lut = np.array([pack_rgba(c, a) for c, a in palette.values()] + [0], dtype="<u4")  # último: sin categoría
+    codes = pd.Categorical(values, categories=list(palette)).codes  # -1 -> último de la tabla
+    return lut[codes]
+
+def rgba_channels(packed: np.ndarray) -> np.ndarray:
+    """Vista (N, 4) uint8 [r, g, b, a] de los colores empaquetados, sin copiar."""
+    return np.ascontiguousarray(packed, dtype="<u4").view(np.uint8).reshape(-1, 4)
+
+def fit_view(lat: np.ndarray, lon: np.ndarray):
+    """(lat, lon, zoom) que encuadran los puntos."""
+    if len(lat) == 0:
+        return 0.0, 0.0, 1.0
+    span = max(float(np.ptp(lat)), float(np.ptp(lon)), 1e-6)
+    zoom = float(np.clip(np.log2(360 / span) - 1, 0, 20))
+    return float(np.mean(lat)), float(np.mean(lon)), zoom
+
+def level_of_detail(lat, lon, rgba, size, zoom: float, bounds=None,
+                    max_points: int = MAP_MAX_POINTS, cell_px: int = MAP_CELL_PX) -> pd.DataFrame:
+    """
+    Devuelve los datos a enviar: lat, lon, r, g, b, a, size, count.
+    bounds=(lat_min, lat_max, lon_min, lon_max) descarta lo que queda fuera de pantalla.
+    """
+    lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+    rgba = np.broadcast_to(np.asarray(rgba, dtype="<u4"), lat.shape)  # admite un solo color para todos
+    size = np.broadcast_to(np.asarray(size, dtype=np.float64), lat.shape)
+    if bounds is not None:
+        keep = (lat >= bounds[0]) & (lat <= bounds[1]) & (lon >= bounds[2]) & (lon <= bounds[3])
+        lat, lon, rgba, size = lat[keep], lon[keep], rgba[keep], size[keep]
+
+    if len(lat) <= max_points:
+        channels = rgba_channels(rgba)
+        return pd.DataFrame({
+            "lat": lat, "lon": lon,
+            "r": channels[:, 0], "g": channels[:, 1], "b": channels[:, 2], "a": channels[:, 3],
+            "size": size, "count": np.ones(len(lat), dtype=np.int64),
+        })
+
+    # Rejilla: grados por píxel a este zoom (256 px de tesela) * cell_px
+    # Se agrupa por (celda, color): una celda con dos equipos da dos puntos, cada uno con el color
+    # de su categoría (promediar los canales daría un color mezclado que no es de nadie)
+    cell = 360 / (256 * 2 ** zoom) * cell_px
+    cells = np.stack([np.floor(lat / cell), np.floor(lon / cell), rgba.astype(np.float64)], axis=1)
+    _, inverse, counts = np.unique(cells, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+
+    def mean(values):
+        return np.bincount(inverse, weights=values) / counts
+
+    group_rgba = np.empty(len(counts), dtype="<u4")
+    group_rgba[inverse] = rgba  # todos los puntos del grupo tienen el mismo color
+    channels = rgba_channels(group_rgba)
+    return pd.DataFrame({
+        "lat": mean(lat), "lon": mean(lon),
+        "r": channels[:, 0], "g": channels[:, 1], "b": channels[:, 2], "a": channels[:, 3],
+        "size": mean(size) * np.sqrt(counts),  # área proporcional al número de puntos
+        "count": counts,
+    })
+
+def render_map(lat, lon, rgba, size=50, zoom: float | None = None, bounds=None,
+               max_points: int = MAP_MAX_POINTS, cell_px: int = MAP_CELL_PX, **kwargs):
+    """Sustituto de st.map para muchos puntos. size en metros (como st.map)."""
+    center_lat, center_lon, fit_zoom = fit_view(np.asarray(lat), np.asarray(lon))
+    zoom = fit_zoom if zoom is None else zoom
+    data = level_of_detail(lat, lon, rgba, size, zoom, bounds, max_points, cell_px)
+    layer = pdk.Layer(
+        "ScatterplotLayer", data=data,
+        get_position=["lon", "lat"], get_fill_color="[r, g, b, a]", get_radius="size",
+        pickable=True,
+    )
+    view = pdk.ViewState(latitude=center_lat, longitude=center_lon, zoom=zoom)
+    st.pydeck_chart(pdk.Deck(layers=[layer], initial_view_state=view, tooltip={"text": "{count} puntos"}), **kwargs)
+    return data
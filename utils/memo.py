@@ -0,0 +1,181 @@
+import functools
+import hashlib
+import inspect
+import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.disk_cache import DiskCache
+from utils.result_cache import ResultCache
+from utils.singleflight import SingleFlight
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Memoización de cálculos caros compartida entre sesiones.
+# El patrón "proceso costoso → botón + session_state" guarda el resultado por sesión: diez usuarios
+# con los mismos parámetros calculan diez veces. @memoize lo comparte:
+# - Nivel 1: memoria del proceso (ResultCache: presupuesto de bytes, TTL, LRU).
+# - Nivel 2: disco (DiskCache, Arrow IPC, un directorio por función). Solo DataFrames; sobrevive a reinicios.
+# - Clave: función + version + hash del código fuente (de la función y de `depends`) + argumentos.
+#   Cambiar el código de la función invalida sus resultados sin hacer nada.
+# - Llamadas simultáneas con la misma clave calculan una vez (SingleFlight).
+# - stats(): aciertos por nivel y segundos de cálculo ahorrados, para ver dónde compensa.
+# Uso:
+#   @memoize(ttl=3600)
+#   def f(size, add): ...
+#   f(20000, 3); f.invalidate(20000, 3); f.invalidate(); f.stats()
+# Los resultados son compartidos: tratarlos como solo lectura (usar .copy() para modificar).
+
+MEMO_MAX_BYTES = 512 * 1024 * 1024
+MEMO_TTL = 3600  # segundos
+MEMO_DIR = ".cache/memo"
+MEMO_DISK_MAX_BYTES = 1024 * 1024 * 1024
+
+_MISS = object()  # marca de "no está en memoria": None es un resultado válido que también se memoiza
+
+def source_hash(*fns) -> str:
+    h = hashlib.sha256()
+    for fn in fns:
+        fn = inspect.unwrap(fn)
+        try:
+            h.update(inspect.getsource(fn).encode("utf-8"))
+        except (OSError, TypeError):  # sin fuente disponible: el bytecode
+            h.update(fn.__code__.co_code)
+    return h.hexdigest()[:12]
+
+def _arg_key(value) -> str:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        hashed = pd.util.hash_pandas_object(value, index=True).to_numpy()
+        cols = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+        return f"df:{hashlib.sha256(hashed.tobytes()).hexdigest()}:{cols!r}"
+    if isinstance(value, np.ndarray):
+        data = np.ascontiguousarray(value)
+        return f"nd:{data.dtype.str}:{data.shape}:{hashlib.sha256(data.tobytes()).hexdigest()}"
+    return repr(value)
+
+class Memo:
+    def __init__(self, max_bytes: int = MEMO_MAX_BYTES, ttl: float = MEMO_TTL, directory: str = MEMO_DIR):
+        # El coste de cada clave se olvida junto con su entrada en memoria (no crece sin límite)
+        self.memory = ResultCache(max_bytes, ttl, on_drop=lambda key: self._costs.pop(key, None))
+        self.directory = directory
+        self.flight = SingleFlight()
+        self._disks = {}  # función -> DiskCache
+        self._costs = {}  # clave -> segundos que costó calcularla
+        self._stats = {}  # función -> contadores
+        self._lock = threading.Lock()
+
+    def disk(self, name: str) -> DiskCache:
+        with self._lock:
+            if name not in self._disks:
+                safe = "".join(c if c.isalnum() or c in "._-" else "_" for c in name)
+                self._disks[name] = DiskCache(os.path.join(self.directory, safe), MEMO_DISK_MAX_BYTES)
+            return self._disks[name]
+
+    def _count(self, name: str, field: str, amount: float = 1):
+        with self._lock:
+            stats = self._stats.setdefault(name, {
+                "calls": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "disk_skipped": 0,
+                "compute_seconds": 0.0, "saved_seconds": 0.0,
+            })
+            stats[field] += amount
+
+    def call(self, name: str, key: str, compute, ttl: float, persist: bool):
+        self._count(name, "calls")
+        value = self.memory.get(key, _MISS)
+        if value is not _MISS:
+            self._hit(name, key, "memory_hits")
+            return value
+        return self.flight.do(key, lambda: self._load(name, key, compute, ttl, persist))
+
+    def _hit(self, name: str, key: str, field: str):
+        self._count(name, field)
+        self._count(name, "saved_seconds", self._costs.get(key, 0.0))
+
+    def _load(self, name: str, key: str, compute, ttl: float, persist: bool):
+        value = self.memory.get(key, _MISS)  # otra llamada pudo terminarlo mientras esperábamos
+        if value is not _MISS:
+            self._hit(name, key, "memory_hits")
+            return value
+        disk = self.disk(name)
+        if persist and disk.enabled:
+            table = disk.get_table(key, max_age=ttl)
+            if table is not None:
+                meta = table.schema.metadata or {}
+                value = table.to_pandas()
+                self.memory.set(key, value, ttl)
+                if key in self.memory:  # después del set: reemplazar la entrada borra su coste
+                    self._costs[key] = float(meta.get(b"memo_cost", 0))
+                self._hit(name, key, "disk_hits")
+                return value
+
+        start = time.perf_counter()
+        value = compute()
+        cost = time.perf_counter() - start
+        self._count(name, "misses")
+        self._count(name, "compute_seconds", cost)
+        self.memory.set(key, value, ttl)
+        if key in self.memory:  # si no cabía en memoria no se guarda su coste
+            self._costs[key] = cost
+        if persist and disk.enabled and isinstance(value, pd.DataFrame):
+            try:
+                table = pa.Table.from_pandas(value)  # conserva el índice (a diferencia de DiskCache.put)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                self._count(name, "disk_skipped")  # p. ej. columna object con tipos mezclados: solo memoria
+                return value
+            meta = {**(table.schema.metadata or {}), b"memo_cost": str(cost).encode()}
+            disk.put(key, table.replace_schema_metadata(meta))
+        return value
+
+    def invalidate(self, name: str, key: str | None = None):
+        """Borra una clave, o todos los resultados de la función si key es None (memoria y disco)."""
+        if key is None:
+            self.memory.invalidate_prefix(name + "|")
+            self.disk(name).invalidate()
+        else:
+            self.memory.invalidate(key)
+            self.disk(name).invalidate(key)
+
+    def stats(self, name: str | None = None) -> dict:
+        with self._lock:
+            if name is not None:
+                return dict(self._stats.get(name, {}))
+            return {n: dict(s) for n, s in self._stats.items()}
+
+@st.cache_resource
+def get_memo() -> Memo:
+    return Memo()
+
+def memoize(fn=None, *, ttl: float = MEMO_TTL, version: int = 1, depends=(), persist: bool = True,
+            name: str | None = None):
+    """
+    depends: otras funciones cuyo código también forma parte de la clave (p. ej. la que hace el trabajo
+    si fn solo la llama). persist=False: solo memoria.
+    """
+    def decorate(fn):
+        func_name = name or f"{fn.__module__}.{fn.__qualname__}"
+        prefix = f"{func_name}|v{version}|{source_hash(fn, *depends)}"
+        signature = inspect.signature(fn)
+
+        def key_for(args, kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()  # f(1) y f(1, add=0) comparten clave
+            return prefix + "|" + ",".join(f"{k}={_arg_key(v)}" for k, v in bound.arguments.items())
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            key = key_for(args, kwargs)
+            return get_memo().call(func_name, key, lambda: fn(*args, **kwargs), ttl, persist)
+
+        def invalidate(*args, **kwargs):
+            """Sin argumentos borra todos los resultados de la función."""
+            get_memo().invalidate(func_name, key_for(args, kwargs) if args or kwargs else None)
+
+        wrapper.invalidate = invalidate
+        wrapper.stats = lambda: get_memo().stats(func_name)
+        return wrapper
+    return decorate(fn) if fn is not None else decorate
@@ -0,0 +1,116 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Cache en memoria con presupuesto de bytes, TTL por entrada y expulsión LRU (o LFU).
+# Lo usan el cache de resultados de BigQuery (utils/bq.py) y la memoización de cálculos (utils/memo.py).
+
+def _nbytes(value, _seen=None) -> int:
+    """Tamaño aproximado en memoria. Recorre listas/tuplas/dicts/sets: un DataFrame dentro de una lista cuenta entero."""
+    if hasattr(value, "memory_usage"):  # DataFrame / Series
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if hasattr(value, "nbytes"):  # arrays / tablas Arrow
+        return int(value.nbytes)
+    if isinstance(value, (list, tuple, set, frozenset, dict)):
+        _seen = set() if _seen is None else _seen
+        if id(value) in _seen:  # referencias circulares / repetidas: se cuentan una vez
+            return 0
+        _seen.add(id(value))
+        items = [*value.keys(), *value.values()] if isinstance(value, dict) else value
+        return sys.getsizeof(value) + sum(_nbytes(item, _seen) for item in items)
+    return sys.getsizeof(value)
+
+class ResultCache:
+    """Cache en memoria limitado por bytes. Thread-safe: lo comparten todas las sesiones."""
+    def __init__(self, max_bytes: int, ttl: float, policy: str = "lru", on_drop=None):
+        """on_drop(key): se llama (con el lock tomado) cada vez que sale una entrada, para limpiar datos asociados."""
+        if policy not in ("lru", "lfu"):
+            raise ValueError("policy debe ser 'lru' o 'lfu'")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.policy = policy
+        self.on_drop = on_drop
+        self._entries = OrderedDict()  # key -> [value, nbytes, expires_at, hits]
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key: str, default=None, keep_stale: bool = False):
+        """
+        keep_stale=True: si ha caducado no se devuelve, pero se deja para peek() (refresco incremental o
+        stale-while-revalidate). Por defecto la entrada caducada se borra y deja de ocupar presupuesto.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry[2] <= time.monotonic():
+                if not keep_stale:
+                    self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            entry[3] += 1
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value, ttl: float | None = None):
+        size = _nbytes(value)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            if size > self.max_bytes:
+                return  # no cabe ni vaciando el cache: no se guarda
+            while self._bytes + size > self.max_bytes:
+                self._drop(self._victim())
+                self.evictions += 1
+            expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+            self._entries[key] = [value, size, expires_at, 0]
+            self._bytes += size
+
+    def peek(self, key: str, default=None):
+        """Devuelve el valor aunque haya caducado (no cuenta como hit ni lo mueve en el LRU)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return default if entry is None else entry[0]
+
+    def invalidate(self, key: str | None = None):
+        """Borra una entrada, o todo el cache si key es None."""
+        with self._lock:
+            if key is None:
+                for k in list(self._entries):
+                    self._drop(k)
+            elif key in self._entries:
+                self._drop(key)
+
+    def __contains__(self, key: str) -> bool:
+        """Presente (aunque haya caducado)."""
+        return key in self._entries
+
+    def invalidate_prefix(self, prefix: str):
+        """Borra todas las entradas cuya clave empieza por prefix."""
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._drop(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "expirations": self.expirations,
+            }
+
+    def _victim(self) -> str:
+        if self.policy == "lfu":
+            return min(self._entries, key=lambda k: self._entries[k][3])
+        return next(iter(self._entries))  # el menos usado recientemente está al principio
+
+    def _drop(self, key: str):
+        self._bytes -= self._entries.pop(key)[1]
+        if self.on_drop is not None:
+            self.on_drop(key)
@@ -0,0 +1,228 @@
+import atexit
+import itertools
+import os
+import shutil
+import threading
+import weakref
+from collections import OrderedDict
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Almacén de resultados (DataFrames) para el patrón "proceso costoso → botón + session_state".
+# Guardar cada resultado en st.session_state no tiene límite: quien barre muchos parámetros acumula
+# DataFrames hasta que el proceso muere por memoria. Aquí:
+# - Hay un presupuesto de memoria por sesión y otro global (todas las sesiones).
+# - Al pasarse, el resultado menos usado recientemente (LRU) se vuelca a disco comprimido.
+# - Al pedirlo de nuevo se recarga solo, el que llama no nota la diferencia. Uno que no cabe en el
+#   presupuesto de la sesión se queda en disco: se lee en cada get, pero no se vuelve a escribir.
+# - Los ficheros se leen/escriben fuera del lock: una sesión volcando a disco no bloquea a las demás.
+# - stats() dice cuánto ocupa cada sesión en memoria y en disco.
+# - Al cerrarse la sesión (Streamlit descarta su session_state) se borran sus resultados y volcados.
+# - Cada proceso vuelca en su propio subdirectorio (RESULTS_SPILL_DIR/<pid>), que borra al salir.
+
+RESULTS_SESSION_MAX_BYTES = 200 * 1024 * 1024
+RESULTS_GLOBAL_MAX_BYTES = 1024 * 1024 * 1024
+RESULTS_SPILL_DIR = ".cache/spill"
+
+def _nbytes(df) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+class ResultStore:
+    def __init__(self, session_max_bytes: int = RESULTS_SESSION_MAX_BYTES,
+                 global_max_bytes: int = RESULTS_GLOBAL_MAX_BYTES, spill_dir: str = RESULTS_SPILL_DIR):
+        self.session_max_bytes = session_max_bytes
+        self.global_max_bytes = global_max_bytes
+        self.spill_dir = os.path.join(spill_dir, str(os.getpid()))  # no pisa otros procesos del mismo directorio
+        self._memory = OrderedDict()  # (session, key) -> (df, nbytes), el menos reciente primero
+        self._spilling = {}           # (session, key) -> (df, nbytes) sacados de memoria, escribiéndose a disco
+        self._spilled = {}            # (session, key) -> (path, nbytes en memoria)
+        self._session_bytes = {}      # session -> bytes en memoria
+        self._bytes = 0
+        self._lock = threading.RLock()  # solo para la contabilidad: la lectura/escritura de ficheros va fuera
+        self._seq = itertools.count(1)
+        self.spills = self.reloads = 0
+        # Restos de un proceso anterior con el mismo pid: ya no los referencia nadie
+        shutil.rmtree(self.spill_dir, ignore_errors=True)
+        os.makedirs(self.spill_dir, exist_ok=True)
+        atexit.register(shutil.rmtree, self.spill_dir, True)
+
+    def put(self, session: str, key: str, df):
+        nbytes = _nbytes(df)
+        if nbytes > self.session_max_bytes:
+            path = self._write(df)  # no cabe nunca en memoria: directo a disco
+            with self._lock:
+                stale = self._forget(session, key)
+                self._spilled[(session, key)] = (path, nbytes)
+                self.spills += 1
+            _remove_all(stale)
+            return
+        with self._lock:
+            stale = self._forget(session, key)
+            self._memory[(session, key)] = (df, nbytes)
+            self._session_bytes[session] = self._session_bytes.get(session, 0) + nbytes
+            self._bytes += nbytes
+            victims = self._enforce(session)
+        _remove_all(stale)
+        self._spill(victims)
+
+    def get(self, session: str, key: str, default=None):
+        mem_key = (session, key)
+        with self._lock:
+            entry = self._memory.get(mem_key)
+            if entry is not None:
+                self._memory.move_to_end(mem_key)
+                return entry[0]
+            entry = self._spilling.get(mem_key)
+            if entry is not None:  # se está volcando ahora mismo: aún está en memoria
+                return entry[0]
+            spilled = self._spilled.get(mem_key)
+            if spilled is None:
+                return default
+        try:
+            df = pd.read_pickle(spilled[0], compression="gzip")
+        except FileNotFoundError:  # se borró mientras leíamos
+            return default
+        with self._lock:
+            self.reloads += 1
+            current = self._spilled.get(mem_key) == spilled
+        # Vuelve a memoria (puede volcar otros), salvo que no quepa nunca: entonces se queda en disco
+        # y no se reescribe en cada lectura. Si entretanto se borró o reemplazó, no se resucita.
+        if current and spilled[1] <= self.session_max_bytes:
+            self.put(session, key, df)
+        return df
+
+    def contains(self, session: str, key: str) -> bool:
+        mem_key = (session, key)
+        return mem_key in self._memory or mem_key in self._spilling or mem_key in self._spilled
+
+    def delete(self, session: str, key: str):
+        with self._lock:
+            stale = self._forget(session, key)
+        _remove_all(stale)
+
+    def clear(self, session: str):
+        with self._lock:
+            stale = []
+            for s, key in [k for k in [*self._memory, *self._spilling, *self._spilled] if k[0] == session]:
+                stale += self._forget(s, key)
+            self._session_bytes.pop(session, None)
+        _remove_all(stale)
+
+    def _forget(self, session: str, key: str) -> list:
+        """Quita la entrada de la contabilidad (con el lock tomado). Devuelve los ficheros a borrar."""
+        entry = self._memory.pop((session, key), None)
+        if entry is not None:
+            self._session_bytes[session] -= entry[1]
+            self._bytes -= entry[1]
+        self._spilling.pop((session, key), None)
+        spilled = self._spilled.pop((session, key), None)
+        return [spilled[0]] if spilled is not None else []
+
+    def _enforce(self, session: str) -> list:
+        # Primero el presupuesto de la sesión (solo sus resultados), luego el global (de cualquiera)
+        victims = []
+        while self._session_bytes.get(session, 0) > self.session_max_bytes:
+            victims.append(self._evict(next(k for k in self._memory if k[0] == session)))
+        while self._bytes > self.global_max_bytes:
+            victims.append(self._evict(next(iter(self._memory))))
+        return victims
+
+    def _evict(self, mem_key):
+        df, nbytes = self._memory.pop(mem_key)
+        self._session_bytes[mem_key[0]] -= nbytes
+        self._bytes -= nbytes
+        self._spilling[mem_key] = (df, nbytes)
+        return mem_key, df, nbytes
+
+    def _spill(self, victims: list):
+        """Escribe a disco (sin el lock) lo que _enforce sacó de memoria."""
+        for mem_key, df, nbytes in victims:
+            path = self._write(df)
+            with self._lock:
+                entry = self._spilling.get(mem_key)
+                if entry is not None and entry[0] is df:  # ni se borró ni se reemplazó mientras escribíamos
+                    del self._spilling[mem_key]
+                    self._spilled[mem_key] = (path, nbytes)
+                    self.spills += 1
+                    path = None
+            if path is not None:
+                _remove(path)
+
+    def _write(self, df) -> str:
+        path = os.path.join(self.spill_dir, f"{next(self._seq)}.pkl.gz")
+        df.to_pickle(path, compression={"method": "gzip", "compresslevel": 1})  # rápido > máxima compresión
+        return path
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = {}
+            for (session, _), (_, nbytes) in self._memory.items():
+                s = sessions.setdefault(session, {"memory_bytes": 0, "in_memory": 0, "disk_bytes": 0, "spilled": 0})
+                s["memory_bytes"] += nbytes
+                s["in_memory"] += 1
+            spilled = [(session, path) for (session, _), (path, _) in self._spilled.items()]
+            totals = {
+                "memory_bytes": self._bytes, "global_max_bytes": self.global_max_bytes,
+                "session_max_bytes": self.session_max_bytes,
+                "spills": self.spills, "reloads": self.reloads,
+            }
+        for session, path in spilled:
+            s = sessions.setdefault(session, {"memory_bytes": 0, "in_memory": 0, "disk_bytes": 0, "spilled": 0})
+            try:
+                s["disk_bytes"] += os.path.getsize(path)
+            except FileNotFoundError:
+                continue
+            s["spilled"] += 1
+        return {**totals, "sessions": sessions}
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _remove_all(paths: list):
+    for path in paths:
+        _remove(path)
+
+@st.cache_resource
+def get_result_store() -> ResultStore:
+    return ResultStore()
+
+def _session_id() -> str:
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else "local"
+
+class SessionResults:
+    """Vista tipo dict de los resultados de la sesión actual: results[run_key] = df, run_key in results..."""
+    def __init__(self, store: ResultStore, session: str):
+        self.store = store
+        self.session = session
+
+    def __setitem__(self, key: str, df):
+        self.store.put(self.session, key, df)
+
+    def __getitem__(self, key: str):
+        df = self.store.get(self.session, key)
+        if df is None:
+            raise KeyError(key)
+        return df
+
+    def __contains__(self, key: str) -> bool:
+        return self.store.contains(self.session, key)
+
+    def clear(self):
+        self.store.clear(self.session)
+
+class _SessionHandle:
+    """Vive en session_state: cuando Streamlit descarta la sesión, se libera y borra sus resultados."""
+
+_HANDLE_KEY = "_result_store_handle"
+
+def get_session_results() -> SessionResults:
+    store, session = get_result_store(), _session_id()
+    if get_script_run_ctx() is not None and _HANDLE_KEY not in st.session_state:
+        handle = st.session_state[_HANDLE_KEY] = _SessionHandle()
+        weakref.finalize(handle, store.clear, session)
+    return SessionResults(store, session)
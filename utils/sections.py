@@ -0,0 +1,59 @@
+import streamlit as st
+
+# Secciones de página con reruns parciales (sobre st.fragment).
+# - Cada sección es un fragment: tocar un widget de la sección solo re-ejecuta esa sección,
+#   el resto de la página se queda como estaba (no se vuelve a dibujar mapas, tablas, forms...).
+# - Cada sección declara las claves de session_state que LEE (reads) y las que ESCRIBEN sus widgets
+#   o su código (writes).
+# - Si un rerun parcial cambia una clave que otra sección de la página lee (y que se ha dibujado en
+#   esta pasada), se hace un rerun de la app para que esa sección se actualice. Si no, el rerun se
+#   queda en la sección. Declarar reads solo para dependencias reales: cada una cuesta un rerun completo.
+# Uso:
+#   sections = Sections("architecture")   # al principio de la página (marca una pasada completa)
+#   @sections.section(reads=["count"], writes=["count"])
+#   def contador(): ...
+#   contador()
+
+def _same(a, b) -> bool:
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):  # p. ej. DataFrames: == no devuelve un bool
+        return a is b
+
+class Sections:
+    def __init__(self, page: str):
+        self.page = page
+        self._reads = {}  # nombre de sección -> set de claves que lee
+        state = st.session_state.setdefault(f"_sections_{page}", {"run": 0, "seen": {}, "values": {}})
+        state["run"] += 1  # nueva pasada completa de la página
+        self._state = state
+
+    def section(self, reads=(), writes=(), name: str | None = None):
+        def decorator(fn):
+            section_name = name or fn.__name__
+            self._reads[section_name] = set(reads)
+
+            @st.fragment
+            def run(*args, **kwargs):
+                self._run(section_name, set(writes), fn, args, kwargs)
+
+            return run
+        return decorator
+
+    def _run(self, name: str, writes: set, fn, args, kwargs):
+        ss = st.session_state
+        state = self._state = ss[f"_sections_{self.page}"]
+        partial = state["seen"].get(name) == state["run"]  # ya se ejecutó en esta pasada: rerun parcial
+        state["seen"][name] = state["run"]
+
+        fn(*args, **kwargs)
+
+        now = {k: ss.get(k) for k in writes}
+        before = state["values"].get(name, {})
+        state["values"][name] = now
+        if not partial:
+            return
+        changed = {k for k in writes if k in before and not _same(now[k], before[k])}
+        if any(changed & reads for other, reads in self._reads.items()
+               if other != name and state["seen"].get(other) == state["run"]):
+            st.rerun()  # otra sección depende de lo que ha cambiado: rerun de la app
@@ -0,0 +1,36 @@
+import threading
+from concurrent.futures import Future
+
+# Si varias llamadas simultáneas piden lo mismo (misma clave), solo la primera hace el trabajo;
+# las demás esperan al mismo Future y reciben el mismo resultado (o la misma excepción).
+# Solo agrupa llamadas simultáneas: al terminar se olvida la clave, no es un cache.
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}  # key -> Future
+        self._lock = threading.Lock()
+        self.leaders = self.shared = 0
+
+    def do(self, key: str, fn):
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._calls[key] = Future()
+                self.leaders += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return fut.result()
+        try:
+            fut.set_result(fn())
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return fut.result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared}
@@ -1,22 +1,187 @@
+import json
+import os
+import sqlite3
+import threading
 import streamlit as st
 
-def init_global(global_key: str, default):
-    """Asegura que la clave global exista con un valor por defecto."""
-    st.session_state.setdefault(global_key, default) #setDefault solo escribe si no existe ya la clave
-
-def mirror_global_to_local(local_key: str, global_key: str):
-    """
-    Copia SIEMPRE el valor global al local.
-    LLAMAR ANTES de renderizar el widget con key=local_key.
-    """
-    st.session_state[local_key] = st.session_state[global_key]
-
-def bind_local_to_global(local_key: str, global_key: str):
-    """
-    Callback para widgets locales: al cambiar, copia local -> global.
-    El siguiente rerun volverá a hacer global -> local (mirror),
-    garantizando que el widget muestre el valor correcto en cualquier página.
-    """
-    def _sync():
-        st.session_state[global_key] = st.session_state[local_key]
-    return _sync
\ No newline at end of file
+# --- REGISTRO DE GLOBALES CON VERSIONES ---
+# Patrón global <-> local para compartir filtros entre páginas:
+# - Cada global se declara UNA vez (clave + default) en GLOBALS.
+# - Cada escritura sube un contador de versión por clave.
+# - sync() solo copia global -> local las claves cuya versión cambió desde la última vez
+#   que esa página las vio (o cuyo widget local ya no existe), no todas en cada rerun.
+# - Los callbacks no escriben directamente: encolan y se aplica todo junto en el siguiente flush().
+
+# --- STORE COMPARTIDO ENTRE SESIONES (por usuario) ---
+# Algunas globales (shared=True) se comparten entre todas las pestañas/sesiones del mismo usuario.
+# - Lecturas sin lock: cada usuario tiene una instantánea (versión, dict) que nunca se modifica;
+#   escribir crea una instantánea nueva y la sustituye con una sola asignación.
+# - Persistencia opcional en SQLite (SHARED_STATE_DB) para sobrevivir a reinicios.
+# - Las partes de la página que dependen de globales compartidas (GLOBALS.shared_section) llevan un
+#   fragment vigilante vacío que cada SHARED_POLL compara la versión del store con la aplicada en la
+#   sesión. Sin cambios no se redibuja nada; solo cuando otra sesión del usuario publica se hace rerun.
+#   (Streamlit no tiene forma pública de re-ejecutar otro fragment desde el vigilante: scope="fragment"
+#   solo re-ejecutaría el propio vigilante, así que ese rerun es de la app.)
+
+SHARED_STATE_DB = os.environ.get("SHARED_STATE_DB")  # None = solo memoria
+SHARED_POLL = "5s"
+
+class SharedStore:
+    def __init__(self, db_path: str | None = SHARED_STATE_DB):
+        self.db_path = db_path
+        self._snapshots = {}  # user -> (version, {key: value})
+        self._lock = threading.Lock()  # solo para escritores
+        if db_path:
+            with sqlite3.connect(db_path) as conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS shared_state (user TEXT, key TEXT, value TEXT, PRIMARY KEY (user, key))")
+                rows = conn.execute("SELECT user, key, value FROM shared_state").fetchall()
+            for user, key, value in rows:
+                _, data = self._snapshots.get(user, (0, {}))
+                self._snapshots[user] = (1, {**data, key: json.loads(value)})
+
+    def snapshot(self, user: str):
+        """(versión, dict) del usuario. No copiar ni modificar el dict: es compartido."""
+        return self._snapshots.get(user, (0, {}))
+
+    def publish(self, user: str, values: dict):
+        # Todo con el lock: dos publicaciones simultáneas se guardan en el mismo orden que sus versiones
+        with self._lock:
+            version, data = self._snapshots.get(user, (0, {}))
+            self._snapshots[user] = (version + 1, {**data, **values})
+            if self.db_path:
+                with sqlite3.connect(self.db_path) as conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO shared_state (user, key, value) VALUES (?, ?, ?)",
+                        [(user, key, json.dumps(value)) for key, value in values.items()],
+                    )
+
+@st.cache_resource
+def get_shared_store() -> SharedStore:
+    return SharedStore()
+
+_VERSIONS = "_global_versions"  # global_key -> versión
+_SEEN = "_global_seen"          # local_key -> versión que se copió por última vez
+_PENDING = "_global_pending"    # global_key -> valor pendiente de aplicar
+_SHARED_SEEN = "_shared_seen"   # versión del SharedStore aplicada en esta sesión
+
+class GlobalRegistry:
+    def __init__(self):
+        self._defaults = {}
+        self._shared = set()
+
+    def declare(self, global_key: str, default, shared: bool = False):
+        """
+        Declara una global compartida entre páginas con su valor por defecto.
+        shared=True: además se comparte entre todas las sesiones del mismo usuario (SharedStore).
+        """
+        self._defaults[global_key] = default
+        if shared:
+            self._shared.add(global_key)
+
+    def _user(self):
+        return st.session_state.get("user_email")
+
+    def init(self):
+        """Crea las globales que falten (una vez por sesión) y aplica escrituras pendientes."""
+        ss = st.session_state
+        ss.setdefault(_VERSIONS, {})
+        ss.setdefault(_SEEN, {})
+        ss.setdefault(_PENDING, {})
+        for key, default in self._defaults.items():
+            if key not in ss:
+                ss[key] = default
+                ss[_VERSIONS][key] = 0
+        self.flush()
+        self.pull()
+
+    def set(self, global_key: str, value):
+        """Encola una escritura; varias escrituras a la misma clave antes del flush cuentan como una."""
+        st.session_state.setdefault(_PENDING, {})[global_key] = value
+
+    def flush(self, publish: bool = True) -> bool:
+        """Aplica las escrituras pendientes. Devuelve True si alguna global cambió."""
+        ss = st.session_state
+        pending = ss.get(_PENDING)
+        if not pending:
+            return False
+        versions = ss[_VERSIONS]
+        changed = {}
+        for key, value in pending.items():
+            if ss.get(key) != value:
+                ss[key] = value
+                versions[key] = versions.get(key, 0) + 1
+                changed[key] = value
+        pending.clear()
+        shared = {k: v for k, v in changed.items() if k in self._shared}
+        if publish and shared and self._user():
+            get_shared_store().publish(self._user(), shared)
+        return bool(changed)
+
+    def pull(self) -> bool:
+        """Trae las globales compartidas que otra sesión del usuario cambió. True si cambió alguna."""
+        user = self._user()
+        if not user or not self._shared:
+            return False
+        version, data = get_shared_store().snapshot(user)
+        ss = st.session_state
+        if ss.get(_SHARED_SEEN) == (user, version):
+            return False
+        ss[_SHARED_SEEN] = (user, version)
+        for key in self._shared & data.keys():
+            self.set(key, data[key])
+        return self.flush(publish=False)
+
+    def shared_section(self, run_every: str = SHARED_POLL):
+        """
+        Decorador: la función pasa a ser un fragment (sus widgets solo la re-ejecutan a ella) con un
+        vigilante que cada run_every mira si otra sesión del usuario cambió las globales compartidas.
+        Sin cambios no se redibuja la sección. Llamar sync() dentro de la función, antes de los widgets.
+        """
+        def decorator(fn):
+            @st.fragment
+            def run(*args, **kwargs):
+                self.pull()
+                if self._user() and self._shared:
+                    self._watch(run_every)
+                fn(*args, **kwargs)
+            return run
+        return decorator
+
+    def _watch(self, run_every: str):
+        """Fragment sin contenido: solo compara versiones (una lectura de dict) y hace rerun si cambian."""
+        user = self._user()
+
+        def check():
+            version, _ = get_shared_store().snapshot(user)
+            if st.session_state.get(_SHARED_SEEN) != (user, version):
+                st.rerun()  # pull() la aplica en la siguiente pasada
+
+        st.fragment(check, run_every=run_every)()
+
+    def version(self, global_key: str) -> int:
+        return st.session_state.get(_VERSIONS, {}).get(global_key, 0)
+
+    def sync(self, mapping: dict):
+        """
+        mapping: {local_key: global_key}. LLAMAR ANTES de renderizar los widgets locales.
+        Solo copia las globales que han cambiado desde que este widget las vio.
+        """
+        self.init()
+        ss = st.session_state
+        seen = ss[_SEEN]
+        for local_key, global_key in mapping.items():
+            version = ss[_VERSIONS].get(global_key, 0)
+            if local_key not in ss or seen.get(local_key) != version:
+                ss[local_key] = ss[global_key]
+                seen[local_key] = version
+
+    def bind(self, local_key: str, global_key: str):
+        """Callback on_change para el widget local: encola local -> global."""
+        def _sync():
+            self.set(global_key, st.session_state[local_key])
+        return _sync
+
+# Globales de la app: se declaran aquí una sola vez
+GLOBALS = GlobalRegistry()
+GLOBALS.declare("global_group", "A", shared=True)
+GLOBALS.declare("global_threshold", 50, shared=True)